@@ -0,0 +1,369 @@
+"""Offline benchmarks for the complaint pipeline.
+
+Swaps the shared chat model for complaint_workflow.fake_llm.FakeChatModel,
+so nothing is sent to OpenAI, and reports throughput and latency
+percentiles at each concurrency level for three layers:
+
+    graph   the compiled graph alone (ainvoke, no checkpointer)
+    db      database.py operations on a fresh SQLite file
+    server  the full HTTP path: POST /api/complaints until the complaint is
+            closed, against uvicorn started in this process
+
+    python benchmark.py all --concurrency 1,8,32 --requests 100 --latency 0.2
+
+With --compact both the graph layer runs once with full replies and once in
+compact mode (see compact.py), and the mean output tokens per complaint of
+each node are compared; --token-latency makes the fake LLM's generation
+time grow with its output, as a real model's does.
+
+Each run uses a fresh working directory (databases, checkpoints). Canned
+answers come from results.json.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Awaitable, Callable
+
+LAYERS = ("graph", "db", "server")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("layers", nargs="*", default=["all"], help="graph, db, server or all")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=50, help="operations per level")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument(
+        "--distribution", default="constant", choices=("constant", "normal", "lognormal")
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--compact", default="off", choices=("off", "on", "both"), help="compact replies (graph layer)"
+    )
+    parser.add_argument(
+        "--token-latency", type=float, default=0.0, help="fake LLM seconds per output token"
+    )
+    parser.add_argument("--results", default="results.json", help="canned answers")
+    parser.add_argument("--workdir", help="defaults to a new temporary directory")
+    parser.add_argument("--json", help="also write the report rows to this file")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.layers = list(LAYERS) if "all" in args.layers else args.layers
+    return args
+
+
+def configure_environment(args, queue_depth: int):
+    """Point everything at the fake LLM and a scratch directory.
+
+    Must run before the workflow, database or server modules are imported:
+    they read their settings at import time.
+    """
+    os.environ.update(
+        LLM_BACKEND="fake",
+        LLM_CACHE="0",
+        DEDUP="0",
+        FAKE_LLM_LATENCY=str(args.latency),
+        FAKE_LLM_JITTER=str(args.jitter),
+        FAKE_LLM_DISTRIBUTION=args.distribution,
+        FAKE_LLM_ERROR_RATE=str(args.error_rate),
+        FAKE_LLM_TOKEN_LATENCY=str(args.token_latency),
+        FAKE_LLM_RESULTS=os.path.abspath(args.results),
+        QUEUE_MAX_DEPTH=str(queue_depth),
+        # Events are formatted and written as usual, so their cost is measured.
+        EVENT_LOG=os.devnull,
+    )
+    workdir = args.workdir or tempfile.mkdtemp(prefix="complaint-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    return workdir
+
+
+def quiet_server_logs():
+    """Keep the report readable: the server, queue and HTTP client log every request.
+
+    Not logging.disable(), which would also silence the event log and leave
+    its cost out of the measurements.
+    """
+    for name in ("server", "job_queue", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def complaint_texts(path: str) -> list[str]:
+    if os.path.exists(path):
+        with open(path) as f:
+            texts = [r["complaint"] for r in json.load(f)]
+        if texts:
+            return texts
+    return ["The Downside Up portal opens at different times each day. How do I predict when?"]
+
+
+async def closed_loop(
+    requests: int, concurrency: int, call: Callable[[int], Awaitable[None]]
+) -> dict:
+    """Run ``call(i)`` for i in range(requests), ``concurrency`` at a time."""
+    latencies: list[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def report_row(layer: str, operation: str, concurrency: int, run: dict) -> dict:
+    from complaint_workflow.metrics import percentiles
+
+    done = len(run["latencies"])
+    return {
+        "layer": layer,
+        "operation": operation,
+        "concurrency": concurrency,
+        "ok": done,
+        "errors": run["errors"],
+        "throughput": done / run["elapsed"] if run["elapsed"] else 0.0,
+        **percentiles(run["latencies"]),
+        "max": max(run["latencies"], default=None),
+    }
+
+
+def print_rows(rows: list[dict]):
+    header = f"{'layer':<7} {'operation':<16} {'conc':>5} {'ok':>6} {'err':>5} {'ops/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    print(header)
+    print("-" * len(header))
+
+    def ms(value):
+        return f"{value * 1000:7.1f}m" if value is not None else "       -"
+
+    for r in rows:
+        print(
+            f"{r['layer']:<7} {r['operation']:<16} {r['concurrency']:>5} {r['ok']:>6} "
+            f"{r['errors']:>5} {r['throughput']:>9.1f} {ms(r['p50'])} {ms(r['p95'])} "
+            f"{ms(r['p99'])} {ms(r['max'])}"
+        )
+
+
+# --- layers ---
+
+def output_tokens_per_node(results: list[dict]) -> dict[str, float]:
+    """Mean output tokens per complaint for each node."""
+    totals: dict[str, int] = {}
+    for result in results:
+        for entry in result.get("node_metrics", []):
+            totals[entry["node"]] = totals.get(entry["node"], 0) + entry["output_tokens"]
+    return {node: total / len(results) for node, total in sorted(totals.items())} if results else {}
+
+
+def print_output_tokens(tokens: dict[str, dict[str, float]]):
+    modes = list(tokens)
+    header = f"{'node':<22}" + "".join(f"{mode:>10}" for mode in modes)
+    if len(modes) == 2:
+        header += f"{'change':>9}"
+    print(header)
+    print("-" * len(header))
+    # Nodes without LLM calls (validate, the fan-in) are left out.
+    nodes = sorted({node for per_node in tokens.values() for node, n in per_node.items() if n})
+    for node in nodes + ["total"]:
+        values = [
+            sum(per_node.values()) if node == "total" else per_node.get(node, 0.0)
+            for per_node in tokens.values()
+        ]
+        line = f"{node:<22}" + "".join(f"{value:>10.1f}" for value in values)
+        if len(modes) == 2 and values[0]:
+            line += f"{(values[1] - values[0]) / values[0] * 100:>8.0f}%"
+        print(line)
+
+
+async def bench_graph(args, texts) -> list[dict]:
+    from complaint_workflow import compile_graph, new_complaint_state
+    from complaint_workflow.compact import set_compact
+
+    graph = compile_graph()
+    rows = []
+    modes = {"off": [False], "on": [True], "both": [False, True]}[args.compact]
+    for compact in modes:
+        set_compact(compact)
+        mode = "compact" if compact else "full"
+        await graph.ainvoke(new_complaint_state(texts[0]))  # warm-up
+        results = []
+        for concurrency in args.concurrency:
+            level_results = []
+
+            async def call(i):
+                level_results.append(await graph.ainvoke(new_complaint_state(texts[i % len(texts)])))
+
+            run = await closed_loop(args.requests, concurrency, call)
+            operation = "ainvoke compact" if compact else "ainvoke"
+            row = report_row("graph", operation, concurrency, run)
+            row["output_tokens"] = output_tokens_per_node(level_results)
+            rows.append(row)
+            results += level_results
+        args.output_tokens[mode] = output_tokens_per_node(results)
+    return rows
+
+
+async def bench_db(args, texts) -> list[dict]:
+    import database
+
+    database.init_db()
+    state = {
+        "categories": ["portal"],
+        "investigation_findings": {"portal": "x" * 2000},
+        "resolution": "y" * 1000,
+        "closure_log": "z" * 500,
+        "node_metrics": [],
+    }
+    rows = []
+    for concurrency in args.concurrency:
+        ids: list[str] = []
+
+        async def create(i):
+            ids.append((await asyncio.to_thread(database.create_complaint, texts[i % len(texts)]))["id"])
+
+        async def get(i):
+            await asyncio.to_thread(database.get_complaint, random.choice(ids))
+
+        async def list_page(i):
+            await asyncio.to_thread(database.list_complaints, 50)
+
+        async def claim_and_save(i):
+            if await asyncio.to_thread(database.claim_complaint, ids[i], "bench", 60):
+                await asyncio.to_thread(database.save_workflow_result, ids[i], state, "bench")
+
+        for operation, call in (
+            ("create", create), ("get", get), ("list", list_page), ("claim+save", claim_and_save)
+        ):
+            run = await closed_loop(args.requests, concurrency, call)
+            rows.append(report_row("db", operation, concurrency, run))
+    return rows
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int):
+    """Run the FastAPI app under uvicorn on a background thread."""
+    import uvicorn
+
+    import server
+
+    uv = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=uv.run, daemon=True)
+    thread.start()
+    while not uv.started:
+        time.sleep(0.05)
+    return uv, thread
+
+
+async def wait_closed(client, complaint_id: str):
+    """Follow the complaint's SSE stream until it is closed (or errored)."""
+    async with client.stream("GET", f"/api/complaints/{complaint_id}/events") as response:
+        async for line in response.aiter_lines():
+            if line.startswith("data:"):
+                status = json.loads(line[5:]).get("status")
+                if status == "error":
+                    raise RuntimeError(f"Complaint {complaint_id} failed")
+                if status == "closed":
+                    return
+
+
+async def bench_server(args, texts) -> list[dict]:
+    import httpx
+
+    port = free_port()
+    uv, thread = start_server(port)
+    rows = []
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            response = await client.post("/api/complaints", json={"complaint": texts[0]})
+            await wait_closed(client, response.json()["id"])  # warm-up
+            for concurrency in args.concurrency:
+                async def submit_to_closed(i):
+                    response = await client.post(
+                        "/api/complaints", json={"complaint": texts[i % len(texts)]}
+                    )
+                    response.raise_for_status()
+                    await wait_closed(client, response.json()["id"])
+
+                run = await closed_loop(args.requests, concurrency, submit_to_closed)
+                rows.append(report_row("server", "submit->closed", concurrency, run))
+    finally:
+        uv.should_exit = True
+        thread.join()
+    return rows
+
+
+BENCHES = {"graph": bench_graph, "db": bench_db, "server": bench_server}
+
+
+async def main(args):
+    texts = complaint_texts(os.environ["FAKE_LLM_RESULTS"])
+    rows = []
+    for layer in args.layers:
+        rows += await BENCHES[layer](args, texts)
+    return rows
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.json = os.path.abspath(args.json) if args.json else None
+    args.output_tokens = {}
+    workdir = configure_environment(args, max(100, max(args.concurrency) * 2))
+    quiet_server_logs()
+    rows = asyncio.run(main(args))
+    print(
+        f"Fake LLM: {args.distribution} latency {args.latency}s jitter {args.jitter} "
+        f"error rate {args.error_rate} token latency {args.token_latency}s; workdir {workdir}\n"
+    )
+    print_rows(rows)
+    if args.output_tokens:
+        print("\nMean output tokens per complaint:\n")
+        print_output_tokens(args.output_tokens)
+    from complaint_workflow.batching import batch_stats
+    from complaint_workflow.callpolicy import call_stats
+    from complaint_workflow.llm import limiter
+
+    if call_stats.stats():
+        print(f"\nLLM call retries/timeouts/hedges: {call_stats.stats()}")
+    if batch_stats():
+        print(f"\nLLM micro-batches: {batch_stats()}")
+    if limiter is not None:
+        stats = limiter.stats()
+        waits = ", ".join(
+            f"{node} {q['mean'] * 1000:.1f}/{q['max'] * 1000:.1f}ms"
+            for node, q in stats["queue_seconds"].items()
+        )
+        print(
+            f"\nLLM limiter: concurrency limit {stats['limit']}, {stats['rate_limited']} rate-limited; "
+            f"queued mean/max: {waits or '-'}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
@@ -1,4 +1,4 @@
-from complaint_workflow.state import ComplaintState
+from complaint_workflow.state import ComplaintState, new_complaint_state
 from complaint_workflow.graph import app, compile_graph
 
-__all__ = ["app", "compile_graph", "ComplaintState"]
+__all__ = ["app", "compile_graph", "ComplaintState", "new_complaint_state"]
@@ -0,0 +1,244 @@
+"""Cross-complaint micro-batching of same-stage LLM calls.
+
+Validation and closure prompts are short and ask for a one-word answer plus
+a reason, and under load dozens of them run at once for different
+complaints. With LLM_BATCH=1 such calls are collected per stage for up to
+LLM_BATCH_WINDOW_MS after the first one arrives, or until
+LLM_BATCH_MAX_ITEMS are waiting, and sent as one structured-output request
+that numbers the prompts and asks for one answer per number. Each waiting
+node gets back its own answer as text, in the same "ANSWER\\nreason" shape
+as an individual call, so the nodes parse it unchanged.
+
+The batch goes through call_llm under the stage's name, so the limiter,
+timeouts and retries treat it as a single call, bounded by the earliest
+deadline in it. A batch of one is sent as the plain prompt. Answered items
+are handed back at once, and items the model leaves out of its answer (or
+all of them, if the answer does not parse) are asked again on their own,
+concurrently. The batch's
+token usage is split evenly across its items in the per-node metrics.
+
+Settings (read at import):
+
+    LLM_BATCH             1 to enable batching (0)
+    LLM_BATCH_STAGES      stages to batch (validate_category,close)
+    LLM_BATCH_WINDOW_MS   how long to collect after the first item (30)
+    LLM_BATCH_MAX_ITEMS   send at once when this many are waiting (16)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from pydantic import BaseModel, Field
+
+from complaint_workflow.eventlog import emit
+from complaint_workflow.llm import acall_llm, call_llm, get_llm
+from complaint_workflow.metrics import charge
+
+LLM_BATCH = os.environ.get("LLM_BATCH", "0") == "1"
+LLM_BATCH_STAGES = set(os.environ.get("LLM_BATCH_STAGES", "validate_category,close").split(","))
+LLM_BATCH_WINDOW = float(os.environ.get("LLM_BATCH_WINDOW_MS", "30")) / 1000
+LLM_BATCH_MAX_ITEMS = int(os.environ.get("LLM_BATCH_MAX_ITEMS", "16"))
+
+
+class BatchAnswer(BaseModel):
+    item: int = Field(description="Number of the item being answered")
+    answer: str = Field(description="The one word the item asks for, e.g. VALID or SATISFIED")
+    reason: str = Field(description="The brief explanation the item asks for")
+
+
+class BatchAnswers(BaseModel):
+    """Answers to a batch of numbered, independent requests."""
+
+    answers: list[BatchAnswer] = Field(description="Exactly one entry per item")
+
+
+def _batch_prompt(prompts: list[str]) -> str:
+    items = "\n\n".join(f"=== ITEM {i} ===\n{prompt}" for i, prompt in enumerate(prompts, 1))
+    return f"""Answer each of the {len(prompts)} numbered items below on its own; they are unrelated requests.
+For each item, give the one word it asks for as the answer, and its brief explanation as the reason.
+
+{items}"""
+
+
+def _usage(message) -> tuple[int, int]:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+
+@dataclass
+class _Item:
+    prompt: str
+    deadline: Optional[float]
+    kwargs: dict = field(default_factory=dict)
+    future: concurrent.futures.Future = field(default_factory=concurrent.futures.Future)
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+class MicroBatcher:
+    """Collects one stage's prompts and sends them in batches.
+
+    ``submit`` returns a future resolving to (answer text, input tokens,
+    output tokens), the tokens being the item's share of the batch's usage.
+    A collector thread closes each batch; batches are sent on a thread pool,
+    so a slow one does not hold up the next.
+    """
+
+    def __init__(self, stage: str, window: float = LLM_BATCH_WINDOW, max_items: int = LLM_BATCH_MAX_ITEMS):
+        self.stage = stage
+        self.window = window
+        self.max_items = max_items
+        self.batches = 0
+        self.items = 0
+        self._pending: list[_Item] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, prompt: str, deadline: Optional[float] = None, **kwargs) -> concurrent.futures.Future:
+        """Queue ``prompt``; ``kwargs`` (e.g. stop) apply if it is sent on its own."""
+        item = _Item(prompt, deadline, kwargs)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._collect, name=f"batch-{self.stage}", daemon=True
+                )
+                self._thread.start()
+            self._pending.append(item)
+            self._cond.notify()
+        return item.future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                send_at = self._pending[0].queued_at + self.window
+                while len(self._pending) < self.max_items:
+                    left = send_at - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                batch = self._pending[: self.max_items]
+                del self._pending[: self.max_items]
+            # Callers that gave up (a cancelled async node) are left out.
+            batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+            if batch:
+                self.batches += 1
+                self.items += len(batch)
+                _executor.submit(self._send, batch)
+
+    def _send(self, batch: list[_Item]):
+        try:
+            self._call(batch)
+        except BaseException as exc:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+
+    def _call(self, batch: list[_Item]):
+        """Resolve each item's future, answered ones as soon as the batch is back."""
+        if len(batch) == 1:
+            self._resolve_single(batch[0])
+            return
+        deadlines = [item.deadline for item in batch if item.deadline]
+        emit("llm", "batch sent", logging.DEBUG, stage=self.stage, items=len(batch))
+        result = call_llm(
+            self.stage,
+            [HumanMessage(content=_batch_prompt([item.prompt for item in batch]))],
+            _structured_llm(self.stage, len(batch)),
+            deadline=min(deadlines) if deadlines else None,
+        )
+        input_tokens, output_tokens = _usage(result["raw"])
+        share = (input_tokens // len(batch), output_tokens // len(batch))
+        by_item = {}
+        if result["parsed"] is not None:
+            by_item = {a.item: f"{a.answer}\n{a.reason}" for a in result["parsed"].answers}
+        for i, item in enumerate(batch, 1):
+            if i in by_item:
+                item.future.set_result((by_item[i], *share))
+            else:
+                emit("llm", "batch item unanswered", logging.WARNING, stage=self.stage, item=i)
+                _executor.submit(self._resolve_single, item)
+
+    def _resolve_single(self, item: _Item):
+        try:
+            item.future.set_result(self._single(item))
+        except BaseException as exc:
+            item.future.set_exception(exc)
+
+    def _single(self, item: _Item) -> tuple[str, int, int]:
+        response = call_llm(
+            self.stage, [HumanMessage(content=item.prompt)], deadline=item.deadline, **item.kwargs
+        )
+        return (response.content, *_usage(response))
+
+
+def _structured_llm(stage: str, items: int):
+    # Tool calling, like the triage node, so the answer round-trips through
+    # the LLM cache; the raw message is kept for its token usage.
+    model = get_llm(stage)
+    max_tokens = getattr(model, "max_tokens", None)
+    if max_tokens:
+        # The stage's limit is meant for one answer.
+        model = model.model_copy(update={"max_tokens": max_tokens * items})
+    return model.with_structured_output(BatchAnswers, method="function_calling", include_raw=True)
+
+
+# Batch sends run here; the context copy keeps events and limiter tickets
+# working, though a batch belongs to no single complaint.
+_executor = ContextThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-batch")
+_batchers: dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def _batcher(stage: str) -> Optional[MicroBatcher]:
+    if not LLM_BATCH or stage not in LLM_BATCH_STAGES:
+        return None
+    with _batchers_lock:
+        if stage not in _batchers:
+            _batchers[stage] = MicroBatcher(stage)
+        return _batchers[stage]
+
+
+def complete(stage: str, prompt: str, deadline: Optional[float] = None, **kwargs) -> str:
+    """The model's text answer to ``prompt``, batched with other complaints'
+    calls of the same stage when batching is on for it. ``kwargs`` go to
+    call_llm, except for a prompt sent as part of a batch."""
+    batcher = _batcher(stage)
+    if batcher is None:
+        return call_llm(stage, [HumanMessage(content=prompt)], deadline=deadline, **kwargs).content
+    text, input_tokens, output_tokens = batcher.submit(prompt, deadline, **kwargs).result()
+    charge(input_tokens, output_tokens)
+    return text
+
+
+async def acomplete(stage: str, prompt: str, deadline: Optional[float] = None, **kwargs) -> str:
+    """Async twin of complete."""
+    batcher = _batcher(stage)
+    if batcher is None:
+        return (await acall_llm(stage, [HumanMessage(content=prompt)], deadline=deadline, **kwargs)).content
+    text, input_tokens, output_tokens = await asyncio.wrap_future(batcher.submit(prompt, deadline, **kwargs))
+    charge(input_tokens, output_tokens)
+    return text
+
+
+def batch_stats() -> dict:
+    """Batches sent, items in them and mean batch size, per stage."""
+    with _batchers_lock:
+        return {stage: batcher.stats() for stage, batcher in sorted(_batchers.items())}
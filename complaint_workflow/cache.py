@@ -0,0 +1,170 @@
+"""Persistent, content-addressed cache for LLM responses.
+
+Every node prompts the shared model at temperature 0, so an identical
+prompt sent to the same model can be answered from disk. Entries are keyed
+on a SHA-256 of LangChain's ``llm_string`` (model name plus call parameters)
+and the prompt, stored in SQLite and evicted least-recently-used once the
+cache grows past ``max_entries`` or an entry is older than ``max_age``.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration
+
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_cache():
+    """Skip the LLM cache (no lookup, no store) for calls made inside the block.
+
+    Scoped with a context variable, so it applies to the current call chain
+    only - including graph nodes run on the event loop or in worker threads -
+    and never to concurrent complaints.
+    """
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+class SQLiteLLMCache(BaseCache):
+    """LangChain cache backed by a local SQLite file with LRU and age eviction."""
+
+    def __init__(
+        self,
+        path: str = ".llm_cache.db",
+        max_entries: int = 10_000,
+        max_age: float = 7 * 24 * 3600,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at);
+            """
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["SQLiteLLMCache"]:
+        """Build the cache from LLM_CACHE_* settings, or None if LLM_CACHE=0."""
+        if os.environ.get("LLM_CACHE", "1") == "0":
+            return None
+        return cls(
+            path=os.environ.get("LLM_CACHE_PATH", ".llm_cache.db"),
+            max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "10000")),
+            max_age=float(os.environ.get("LLM_CACHE_MAX_AGE_SECONDS", str(7 * 24 * 3600))),
+        )
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    @staticmethod
+    def _model_name(llm_string: str) -> str:
+        # llm_string is "<serialized model JSON>---<sorted call params>".
+        try:
+            kwargs = json.loads(llm_string.split("---", 1)[0]).get("kwargs", {})
+        except ValueError:
+            return ""
+        return kwargs.get("model_name") or kwargs.get("model") or ""
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if _bypass.get():
+            return None
+
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return [
+            ChatGeneration(message=message)
+            for message in messages_from_dict(json.loads(row[0]))
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if _bypass.get():
+            return
+        # Only chat generations are produced by the nodes; anything else
+        # (plain completions) is simply not cached.
+        if not all(isinstance(g, ChatGeneration) for g in return_val):
+            return
+
+        value = json.dumps([message_to_dict(g.message) for g in return_val])
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), self._model_name(llm_string), value, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least-recently-used ones above max_entries."""
+        expired = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.max_age,)
+        ).rowcount
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,),
+            )
+        self.evictions += expired + max(excess, 0)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus the current entry count."""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,286 @@
+"""Timeouts, retries and hedging for LLM calls, configurable per node.
+
+``complaint_workflow.llm.call_llm``/``acall_llm`` run every node's LLM call
+under the node's ``CallPolicy``:
+
+- **Timeout.** Each attempt gets at most ``timeout`` seconds. The async path
+  cancels an attempt that runs over. The sync path stops waiting for it.
+- **Retries.** Transient failures are retried up to ``retries`` times, after
+  a full-jitter exponential backoff: a uniform draw in
+  [0, min(backoff_max, backoff_base * 2**attempt)]. Transient failures are
+  timeouts, 429s, 5xx and connection errors, and the fake model's simulated
+  failures.
+- **Hedging.** With ``hedge`` on, if an attempt has not answered after the
+  node's recent ``hedge_percentile`` latency, one duplicate request is sent,
+  and whichever answers first wins. The delay needs at least
+  ``hedge_min_samples`` recent calls before it is known, so there is no
+  hedging until then. Streamed calls are never hedged, because both copies
+  would stream into the same consumer.
+
+- **Deadline.** Called with the complaint's deadline (see deadline.py), an
+  attempt's timeout is capped to the time left, down to a floor of
+  DEADLINE_MIN_CALL_TIMEOUT, and a retry is only started if its backoff
+  ends before the deadline.
+
+Settings come from the environment. ``LLM_TIMEOUT`` is the default, and
+``LLM_TIMEOUT_<NODE>`` (e.g. ``LLM_TIMEOUT_CLOSE``) overrides it for one
+node. The same goes for LLM_RETRIES, LLM_RETRY_BACKOFF, LLM_RETRY_BACKOFF_MAX,
+LLM_HEDGE, LLM_HEDGE_PERCENTILE and LLM_HEDGE_MIN_SAMPLES.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from complaint_workflow.deadline import MIN_CALL_TIMEOUT, remaining
+from complaint_workflow.eventlog import emit
+from complaint_workflow.metrics import percentiles
+
+_TRANSIENT_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+
+class LLMTimeout(TimeoutError):
+    """An LLM call attempt exceeded its node's timeout."""
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether a failed call is worth retrying."""
+    from complaint_workflow.fake_llm import FakeLLMError
+
+    if isinstance(exc, (TimeoutError, ConnectionError, FakeLLMError)):
+        return True
+    if type(exc).__name__ in _TRANSIENT_NAMES:
+        return True
+    status = getattr(exc, "status_code", None)
+    return status in (408, 409, 429) or (isinstance(status, int) and status >= 500)
+
+
+def _setting(name: str, node: str, default: str) -> str:
+    return os.environ.get(f"{name}_{node.upper()}", os.environ.get(name, default))
+
+
+@dataclass
+class CallPolicy:
+    timeout: float = 60.0
+    retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    hedge: bool = False
+    hedge_percentile: int = 95
+    hedge_min_samples: int = 20
+
+    @classmethod
+    def for_node(cls, node: str) -> "CallPolicy":
+        """Policy from LLM_* settings, with LLM_*_<NODE> overrides."""
+        return cls(
+            timeout=float(_setting("LLM_TIMEOUT", node, "60")),
+            retries=int(_setting("LLM_RETRIES", node, "2")),
+            backoff_base=float(_setting("LLM_RETRY_BACKOFF", node, "0.5")),
+            backoff_max=float(_setting("LLM_RETRY_BACKOFF_MAX", node, "8")),
+            hedge=_setting("LLM_HEDGE", node, "0") == "1",
+            hedge_percentile=int(_setting("LLM_HEDGE_PERCENTILE", node, "95")),
+            hedge_min_samples=int(_setting("LLM_HEDGE_MIN_SAMPLES", node, "20")),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+class CallStats:
+    """Recent latencies (for hedge delays) and retry/timeout/hedge counters per node."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._latencies: dict[str, deque] = {}
+        self._counters: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, node: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(node, deque(maxlen=self.window)).append(seconds)
+
+    def count(self, node: str, event: str):
+        with self._lock:
+            self._counters[(node, event)] = self._counters.get((node, event), 0) + 1
+
+    def hedge_delay(self, node: str, policy: CallPolicy) -> Optional[float]:
+        with self._lock:
+            recent = list(self._latencies.get(node, ()))
+        if len(recent) < policy.hedge_min_samples:
+            return None
+        return percentiles(recent, (policy.hedge_percentile,))[f"p{policy.hedge_percentile}"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        nodes: dict[str, dict] = {}
+        for (node, event), count in sorted(counters.items()):
+            nodes.setdefault(node, {})[event] = count
+        return nodes
+
+    def render(self) -> str:
+        """Counters in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+        lines = [
+            "# HELP complaint_llm_call_events_total LLM call retries, timeouts and hedges.",
+            "# TYPE complaint_llm_call_events_total counter",
+        ]
+        for (node, event), count in sorted(counters.items()):
+            lines.append(f'complaint_llm_call_events_total{{node="{node}",event="{event}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+call_stats = CallStats()
+_policies: dict[str, CallPolicy] = {}
+# Sync attempts run here so they can be timed out and hedged; the context
+# (limiter ticket, metrics collector, complaint id) is copied into the thread.
+_executor = ContextThreadPoolExecutor(max_workers=64, thread_name_prefix="llm-call")
+
+
+def policy_for(node: str) -> CallPolicy:
+    if node not in _policies:
+        _policies[node] = CallPolicy.for_node(node)
+    return _policies[node]
+
+
+def _note_retry(node: str, attempt: int, exc: BaseException):
+    call_stats.count(node, "timeout" if isinstance(exc, TimeoutError) else "retry")
+    emit("llm", "retrying", node=node, attempt=attempt + 1, error=type(exc).__name__)
+
+
+def _attempt_timeout(policy: CallPolicy, deadline: Optional[float]) -> float:
+    left = remaining(deadline)
+    if left is None:
+        return policy.timeout
+    return min(policy.timeout, max(left, MIN_CALL_TIMEOUT))
+
+
+def _retry_pause(policy: CallPolicy, attempt: int, exc: Exception, deadline: Optional[float]) -> Optional[float]:
+    """Backoff before the next attempt, or None if the call should fail now."""
+    if attempt == policy.retries or not is_transient(exc):
+        return None
+    pause = policy.backoff(attempt)
+    left = remaining(deadline)
+    if left is not None and left <= pause:
+        return None
+    return pause
+
+
+def run(node: str, call: Callable[[], Any], hedgeable: bool = True, deadline: Optional[float] = None) -> Any:
+    """Run the sync ``call`` under the node's policy, by ``deadline`` if given."""
+    policy = policy_for(node)
+    for attempt in range(policy.retries + 1):
+        try:
+            return _hedged(node, policy, _attempt_timeout(policy, deadline), call, hedgeable)
+        except Exception as exc:
+            pause = _retry_pause(policy, attempt, exc, deadline)
+            if pause is None:
+                raise
+            _note_retry(node, attempt, exc)
+            time.sleep(pause)
+
+
+def _timed(node: str, call: Callable[[], Any]) -> Any:
+    started = time.perf_counter()
+    result = call()
+    call_stats.observe(node, time.perf_counter() - started)
+    return result
+
+
+def _hedged(node: str, policy: CallPolicy, timeout: float, call: Callable[[], Any], hedgeable: bool) -> Any:
+    deadline = time.monotonic() + timeout
+    delay = call_stats.hedge_delay(node, policy) if policy.hedge and hedgeable else None
+    futures = [_executor.submit(_timed, node, call)]
+    hedge: Optional[concurrent.futures.Future] = None
+    error: Optional[BaseException] = None
+    while futures:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        wait = min(remaining, delay) if delay is not None else remaining
+        done, _ = concurrent.futures.wait(futures, wait, concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            futures.remove(future)
+            if future.exception() is None:
+                if future is hedge:
+                    call_stats.count(node, "hedge_won")
+                return future.result()
+            error = future.exception()
+        if delay is not None and not done:
+            call_stats.count(node, "hedged")
+            hedge = _executor.submit(_timed, node, call)
+            futures.append(hedge)
+            delay = None
+    if error is not None and not futures:
+        raise error
+    raise LLMTimeout(f"{node}: no LLM response within {timeout:.3g}s")
+
+
+async def arun(
+    node: str, call: Callable[[], Awaitable[Any]], hedgeable: bool = True, deadline: Optional[float] = None
+) -> Any:
+    """Async twin of run."""
+    policy = policy_for(node)
+    for attempt in range(policy.retries + 1):
+        try:
+            return await _ahedged(node, policy, _attempt_timeout(policy, deadline), call, hedgeable)
+        except Exception as exc:
+            pause = _retry_pause(policy, attempt, exc, deadline)
+            if pause is None:
+                raise
+            _note_retry(node, attempt, exc)
+            await asyncio.sleep(pause)
+
+
+async def _atimed(node: str, call: Callable[[], Awaitable[Any]]) -> Any:
+    started = time.perf_counter()
+    result = await call()
+    call_stats.observe(node, time.perf_counter() - started)
+    return result
+
+
+async def _ahedged(
+    node: str, policy: CallPolicy, timeout: float, call: Callable[[], Awaitable[Any]], hedgeable: bool
+) -> Any:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = call_stats.hedge_delay(node, policy) if policy.hedge and hedgeable else None
+    tasks = [asyncio.ensure_future(_atimed(node, call))]
+    hedge: Optional[asyncio.Future] = None
+    error: Optional[BaseException] = None
+    try:
+        while tasks:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            wait = min(remaining, delay) if delay is not None else remaining
+            done, _ = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tasks.remove(task)
+                if task.exception() is None:
+                    if task is hedge:
+                        call_stats.count(node, "hedge_won")
+                    return task.result()
+                error = task.exception()
+            if delay is not None and not done:
+                call_stats.count(node, "hedged")
+                hedge = asyncio.ensure_future(_atimed(node, call))
+                tasks.append(hedge)
+                delay = None
+        if error is not None and not tasks:
+            raise error
+        raise LLMTimeout(f"{node}: no LLM response within {timeout:.3g}s")
+    finally:
+        for task in tasks:
+            task.cancel()
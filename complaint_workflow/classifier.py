@@ -0,0 +1,219 @@
+"""Local fast path for intake categorization (pure Python, CPU only).
+
+Most complaints name their category outright ("the portal keeps opening"),
+so intake first asks an IntakeClassifier and only spends an LLM round trip
+when it is not confident:
+
+1. Keyword rules. Narrow patterns per category. A hit is only a hint: a
+   complaint can mention a category in passing, or involve one no rule
+   names, so rules alone stay below the threshold.
+2. A small trained model. One-vs-rest logistic regression over TF-IDF word
+   unigrams and bigrams, trained from earlier LLM categorizations (see
+   train_classifier.py). It also learns when a complaint is "other". When
+   rules hit, the model must predict exactly the same categories.
+
+A prediction is used when its confidence reaches ``threshold``, so without a
+trained model every complaint goes to the LLM.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+LABELS = ("portal", "monster", "psychic", "environmental")
+
+RULES = {
+    "portal": [r"\bportals?\b"],
+    "monster": [r"\bdemogorgons?\b", r"\bdemodogs?\b", r"\bmind ?flayers?\b", r"\bvecna\b"],
+    "psychic": [r"\bpsychic\b", r"\btelekine(sis|tic)\b", r"\btelepath\w*"],
+    "environmental": [
+        r"\belectrical\b", r"\bpower (lines?|grid|outages?)\b", r"\bblackouts?\b",
+        r"\blights? (flicker|flickered|flickering)\b",
+    ],
+}
+_RULES = {label: [re.compile(p) for p in patterns] for label, patterns in RULES.items()}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class Prediction:
+    categories: list[str]
+    confidence: float
+    source: str  # "rules", "model" or "rules+model"
+
+
+def rule_labels(text: str) -> list[str]:
+    text = text.lower()
+    return [label for label in LABELS if any(p.search(text) for p in _RULES[label])]
+
+
+def _terms(text: str) -> Counter:
+    tokens = _TOKEN_RE.findall(text.lower())
+    terms = Counter(tokens)
+    terms.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return terms
+
+
+def _sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+class IntakeClassifier:
+    """Keyword rules plus an optional TF-IDF + logistic regression model."""
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        rule_confidence: float = 0.6,
+        model_path: Optional[str] = None,
+    ):
+        self.threshold = threshold
+        self.rule_confidence = rule_confidence
+        self.model_path = model_path
+        self.idf: dict[str, float] = {}
+        self.weights: dict[str, dict[str, float]] = {}
+        self.bias: dict[str, float] = {}
+        self.hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        if model_path and os.path.exists(model_path):
+            self.load(model_path)
+
+    @classmethod
+    def from_env(cls) -> Optional["IntakeClassifier"]:
+        """Build the classifier from INTAKE_CLASSIFIER_* settings, or None if
+        INTAKE_CLASSIFIER=0."""
+        if os.environ.get("INTAKE_CLASSIFIER", "1") == "0":
+            return None
+        return cls(
+            threshold=float(os.environ.get("INTAKE_CLASSIFIER_THRESHOLD", "0.9")),
+            model_path=os.environ.get("INTAKE_CLASSIFIER_MODEL", ".intake_classifier.json"),
+        )
+
+    @property
+    def trained(self) -> bool:
+        return bool(self.weights)
+
+    def _vector(self, text: str) -> dict[str, float]:
+        """L2-normalized TF-IDF vector over the vocabulary seen in training."""
+        vec = {
+            term: (1 + math.log(count)) * self.idf[term]
+            for term, count in _terms(text).items()
+            if term in self.idf
+        }
+        norm = math.sqrt(sum(v * v for v in vec.values()))
+        return {term: v / norm for term, v in vec.items()} if norm else {}
+
+    def _probabilities(self, vec: dict[str, float]) -> dict[str, float]:
+        return {
+            label: _sigmoid(
+                self.bias[label] + sum(self.weights[label].get(t, 0.0) * v for t, v in vec.items())
+            )
+            for label in LABELS
+        }
+
+    def predict(self, text: str) -> Optional[Prediction]:
+        """The model's prediction, checked against the rules; None if neither
+        has an opinion.
+
+        Rule hits the model disagrees with (or rules alone, untrained) are
+        returned with at most ``rule_confidence``.
+        """
+        hits = rule_labels(text)
+        if not self.trained:
+            return Prediction(hits, self.rule_confidence, "rules") if hits else None
+        probs = self._probabilities(self._vector(text))
+        categories = [label for label in LABELS if probs[label] >= 0.5] or ["other"]
+        confidence = min(max(p, 1 - p) for p in probs.values())
+        if not hits:
+            return Prediction(categories, confidence, "model")
+        if categories == hits:
+            return Prediction(categories, confidence, "rules+model")
+        return Prediction(hits, min(confidence, self.rule_confidence), "rules")
+
+    def classify(self, text: str) -> Optional[Prediction]:
+        """A confident prediction, or None to fall back to the LLM. Counted in stats()."""
+        prediction = self.predict(text)
+        confident = prediction is not None and prediction.confidence >= self.threshold
+        with self._lock:
+            if confident:
+                self.hits += 1
+            else:
+                self.fallbacks += 1
+        return prediction if confident else None
+
+    def train(
+        self,
+        examples: Iterable[tuple[str, list[str]]],
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+    ) -> int:
+        """Fit the model on (complaint, categories) pairs; returns the example count.
+
+        Categories outside LABELS (i.e. "other") count as negatives for every
+        label.
+        """
+        examples = [(text, set(categories)) for text, categories in examples]
+        if not examples:
+            return 0
+
+        doc_freq = Counter()
+        for text, _ in examples:
+            doc_freq.update(_terms(text).keys())
+        n = len(examples)
+        self.idf = {term: math.log((1 + n) / (1 + df)) + 1 for term, df in doc_freq.items()}
+
+        data = [(self._vector(text), labels) for text, labels in examples]
+        self.weights = {label: {} for label in LABELS}
+        self.bias = {label: 0.0 for label in LABELS}
+        order = list(range(n))
+        rng = random.Random(0)
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for i in order:
+                vec, labels = data[i]
+                for label in LABELS:
+                    w = self.weights[label]
+                    p = _sigmoid(self.bias[label] + sum(w.get(t, 0.0) * v for t, v in vec.items()))
+                    grad = p - (label in labels)
+                    self.bias[label] -= rate * grad
+                    for t, v in vec.items():
+                        w[t] = w.get(t, 0.0) * (1 - rate * l2) - rate * grad * v
+        return n
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"idf": self.idf, "weights": self.weights, "bias": self.bias}, f)
+
+    def load(self, path: str):
+        with open(path) as f:
+            model = json.load(f)
+        self.idf, self.weights, self.bias = model["idf"], model["weights"], model["bias"]
+
+    def stats(self) -> dict:
+        """How often intake was answered locally in this process."""
+        total = self.hits + self.fallbacks
+        return {
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": self.hits / total if total else 0.0,
+            "trained": self.trained,
+        }
+
+
+# Shared instance used by the intake node; None when disabled with
+# INTAKE_CLASSIFIER=0.
+intake_classifier = IntakeClassifier.from_env()
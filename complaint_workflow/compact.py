@@ -0,0 +1,68 @@
+"""Compact mode: terse reply formats, output-token caps and stop sequences.
+
+Generation time grows with every output token, and most of the workflow's
+output is prose nobody parses: the reason after a verdict, the full
+EVIDENCE/ANALYSIS/CONCLUSION report. With LLM_COMPACT=1 (or set_compact)
+the nodes ask for terse replies instead, and the graph stays the same:
+
+- intake answers with the category list alone, validation and closure with
+  one ``VERDICT: short reason`` line; these calls stop at the first newline.
+- investigation writes one line per section, resolution one RESOLUTION line
+  plus its ESCALATION and EFFECTIVENESS lines.
+- each node's max_tokens defaults to COMPACT_MAX_TOKENS; limits set for the
+  node in models.py still take precedence.
+"""
+
+from __future__ import annotations
+
+import os
+
+# Replies are capped a little above what the terse formats need.
+COMPACT_MAX_TOKENS = {
+    "intake": 16,
+    "triage": 200,
+    "validate_category": 40,
+    "investigate_category": 150,
+    "resolve": 160,
+    "close": 40,
+}
+STOP_SEQUENCES = {
+    "intake": ["\n"],
+    "validate_category": ["\n"],
+    "close": ["\n"],
+}
+# Every compact prompt asks for its format with this phrase.
+REPLY_TERSELY = "Reply tersely"
+
+_enabled = os.environ.get("LLM_COMPACT", "0") == "1"
+
+
+def compact_enabled() -> bool:
+    return _enabled
+
+
+def set_compact(on: bool):
+    """Switch compact mode for calls made from now on (e.g. to compare runs)."""
+    global _enabled
+    _enabled = on
+
+
+def stop_kwargs(node: str) -> dict:
+    """Extra call_llm kwargs for ``node``: its stop sequences in compact mode."""
+    if _enabled and node in STOP_SEQUENCES:
+        return {"stop": STOP_SEQUENCES[node]}
+    return {}
+
+
+def compact_verdict_format(words: str) -> str:
+    """Compact answer instructions for a one-word verdict prompt; ``words``
+    is e.g. "VALID or REJECT"."""
+    return f"{REPLY_TERSELY}, on one line: {words}, a colon, then a reason of at most 12 words."
+
+
+def split_verdict(content: str) -> tuple[str, str]:
+    """(verdict word, reason) from "WORD\\nreason" or a compact "WORD: reason"."""
+    first_line, _, rest = content.strip().partition("\n")
+    word, colon, inline = first_line.partition(":")
+    reason = "\n".join(part.strip() for part in (inline if colon else "", rest) if part.strip())
+    return word.strip().upper(), reason
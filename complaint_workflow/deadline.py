@@ -0,0 +1,77 @@
+"""Per-complaint deadline budget, with graceful degradation near the end.
+
+new_complaint_state stamps each complaint with a ``deadline`` (a time.time()
+value, COMPLAINT_DEADLINE seconds after the workflow starts; 0 turns the
+budget off); queue time before that is not counted. It travels in the
+state, including the Send payloads of the parallel branches. A run resumed
+from a checkpoint gets a fresh one in its config instead (``deadline`` under
+``configurable``), which takes precedence, so the checkpoint and the branch
+writes already in it stay as they are. Each node checks it:
+
+- A node degrades when less than its reserve is left, the time its own call
+  and the stages after it normally need. investigate_category and resolve
+  ask for a brief answer under a lower max_tokens, and close skips the LLM
+  satisfaction check and records the outcome as unverified. Degraded steps
+  are listed in the state's ``degraded_steps``.
+- Every LLM call gets at most the time left (but at least
+  DEADLINE_MIN_CALL_TIMEOUT seconds per attempt), and no retry is started
+  once the deadline has passed (see callpolicy.py).
+
+Settings (read at import):
+
+    COMPLAINT_DEADLINE         budget in seconds per complaint (0 = off)
+    DEADLINE_MIN_CALL_TIMEOUT  floor for a call's timeout past the deadline (5)
+    DEADLINE_RESERVE_<NODE>    seconds below which the node degrades:
+                               INVESTIGATE_CATEGORY (20), RESOLVE (10), CLOSE (4)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Optional
+
+from langgraph.config import get_config
+
+from complaint_workflow.eventlog import emit
+
+COMPLAINT_DEADLINE = float(os.environ.get("COMPLAINT_DEADLINE", "0"))
+MIN_CALL_TIMEOUT = float(os.environ.get("DEADLINE_MIN_CALL_TIMEOUT", "5"))
+
+_DEFAULT_RESERVES = {"investigate_category": 20.0, "resolve": 10.0, "close": 4.0}
+RESERVES = {
+    node: float(os.environ.get(f"DEADLINE_RESERVE_{node.upper()}", default))
+    for node, default in _DEFAULT_RESERVES.items()
+}
+
+
+def new_deadline(budget: Optional[float] = None) -> float:
+    """Deadline ``budget`` seconds (default COMPLAINT_DEADLINE) from now; 0 if off."""
+    budget = COMPLAINT_DEADLINE if budget is None else budget
+    return time.time() + budget if budget > 0 else 0.0
+
+
+def current_deadline(state: dict) -> Optional[float]:
+    """The deadline a node works to: the run config's, else the state's."""
+    try:
+        configurable = get_config().get("configurable", {})
+    except RuntimeError:  # called outside a graph run
+        configurable = {}
+    if "deadline" in configurable:
+        return configurable["deadline"]
+    return state.get("deadline")
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before ``deadline`` (negative once past); None without one."""
+    return deadline - time.time() if deadline else None
+
+
+def should_degrade(state: dict, node: str) -> bool:
+    """Whether ``node`` should run degraded: less than its reserve is left."""
+    left = remaining(current_deadline(state))
+    if left is None or left >= RESERVES.get(node, 0.0):
+        return False
+    emit("deadline", "degrading", logging.WARNING, node=node, remaining=round(left, 2))
+    return True
@@ -0,0 +1,182 @@
+"""Structured, complaint-id-tagged event log.
+
+Nodes and the server report what they do with ``emit(source, event,
+**fields)`` instead of print(). A call only checks the level and puts a
+LogRecord on a bounded in-memory queue, so it never blocks on I/O; a single
+QueueListener thread formats the records and writes them out. Each record is
+tagged with the complaint being processed (``complaint_context``), which
+also carries over into the graph's worker threads and tasks.
+
+Settings (read at import):
+
+    EVENT_LOG          stderr (default), stdout, a file path, or off
+    EVENT_LOG_FORMAT   json (one object per line, default) or text
+    EVENT_LOG_LEVEL    DEBUG, INFO (default), WARNING, ...
+    EVENT_LOG_SAMPLE   fraction of complaints whose events are kept (1.0);
+                       sampling is per complaint id, so a kept complaint
+                       keeps all of its events. Warnings are always kept.
+    EVENT_LOG_QUEUE    queue size (10000); events are dropped, and counted,
+                       when the writer falls this far behind
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+EVENT_LOG = os.environ.get("EVENT_LOG", "stderr")
+EVENT_LOG_FORMAT = os.environ.get("EVENT_LOG_FORMAT", "json")
+EVENT_LOG_LEVEL = os.environ.get("EVENT_LOG_LEVEL", "INFO").upper()
+EVENT_LOG_SAMPLE = float(os.environ.get("EVENT_LOG_SAMPLE", "1.0"))
+EVENT_LOG_QUEUE = int(os.environ.get("EVENT_LOG_QUEUE", "10000"))
+
+complaint_id_var: ContextVar[Optional[str]] = ContextVar("complaint_id", default=None)
+
+
+@contextmanager
+def complaint_context(complaint_id: str):
+    """Tag every event emitted inside the block with ``complaint_id``."""
+    token = complaint_id_var.set(complaint_id)
+    try:
+        yield
+    finally:
+        complaint_id_var.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "complaint_id": record.complaint_id,
+            "source": record.source,
+            "event": record.msg,
+            **record.fields,
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """``HH:MM:SS [SOURCE] event key=value`` lines, for the CLI."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        ts = datetime.fromtimestamp(record.created).strftime("%H:%M:%S")
+        fields = " ".join(f"{k}={v}" for k, v in record.fields.items())
+        line = f"{ts} [{record.source.upper()}] {record.msg}" + (f" {fields}" if fields else "")
+        if record.complaint_id:
+            line = f"{line} ({record.complaint_id[:8]})"
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return line
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full,
+    and skips QueueHandler's eager message formatting."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _output_handler() -> logging.Handler:
+    if EVENT_LOG == "stdout":
+        handler: logging.Handler = logging.StreamHandler(sys.stdout)
+    elif EVENT_LOG == "stderr":
+        handler = logging.StreamHandler(sys.stderr)
+    else:
+        handler = logging.FileHandler(EVENT_LOG)
+    handler.setFormatter(TextFormatter() if EVENT_LOG_FORMAT == "text" else JsonFormatter())
+    return handler
+
+
+_queue: queue.Queue = queue.Queue(EVENT_LOG_QUEUE)
+_handler = _DroppingQueueHandler(_queue)
+_logger = logging.getLogger("complaint_workflow.events")
+_logger.propagate = False
+_logger.setLevel(logging.CRITICAL + 1 if EVENT_LOG == "off" else EVENT_LOG_LEVEL)
+_logger.addHandler(_handler)
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _start():
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = QueueListener(_queue, _output_handler())
+            _listener.start()
+            atexit.register(stop)
+
+
+def stop():
+    """Write out everything queued and stop the writer thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def flush():
+    """Block until every event emitted so far has been written."""
+    if _listener is not None:
+        _queue.join()
+
+
+def dropped() -> int:
+    """Events discarded because the queue was full."""
+    return _handler.dropped
+
+
+def _sampled(complaint_id: Optional[str]) -> bool:
+    if EVENT_LOG_SAMPLE >= 1 or complaint_id is None:
+        return True
+    return zlib.crc32(complaint_id.encode()) % 10000 < EVENT_LOG_SAMPLE * 10000
+
+
+def emit(source: str, event: str, level: int = logging.INFO, exc_info=None, **fields):
+    """Record ``event`` from ``source`` (a node or component name).
+
+    ``fields`` must be JSON-serializable (anything else is written with
+    str()). Cheap when the level is filtered out or the complaint is not
+    sampled.
+    """
+    if not _logger.isEnabledFor(level):
+        return
+    complaint_id = complaint_id_var.get()
+    if level < logging.WARNING and not _sampled(complaint_id):
+        return
+    if _listener is None:
+        _start()
+    _logger.log(
+        level,
+        event,
+        exc_info=exc_info,
+        extra={"source": source, "complaint_id": complaint_id, "fields": fields},
+    )
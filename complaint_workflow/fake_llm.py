@@ -0,0 +1,328 @@
+"""Deterministic offline stand-in for the OpenAI chat model.
+
+FakeChatModel answers every workflow prompt without network access, after
+a configurable simulated latency, so the pipeline's own overhead and
+concurrency behaviour can be measured for free (see benchmark.py). Answers
+for complaints found in results.json are replayed from it; anything else
+gets a canned reply derived from the intake classifier's keyword rules.
+
+Enable it for the whole process with LLM_BACKEND=fake, or swap it in with
+complaint_workflow.llm.set_llm().
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, AsyncIterator, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, PrivateAttr
+
+from complaint_workflow.classifier import rule_labels
+from complaint_workflow.compact import REPLY_TERSELY, split_verdict
+
+_COMPLAINT_RE = re.compile(r"^(?:Original complaint|Complaint): (.*)$", re.MULTILINE)
+_CATEGORY_RE = re.compile(r'categorized as "(\w+)"')
+_ITEM_RE = re.compile(r"^=== ITEM (\d+) ===$", re.MULTILINE)
+_HEADER_RE = re.compile(r"^\**([A-Z][A-Z ]+):\**\s*(.*)$")
+
+
+class FakeLLMError(RuntimeError):
+    """Simulated provider failure, raised with probability ``error_rate``."""
+
+
+class FakeRateLimitError(FakeLLMError):
+    """Simulated HTTP 429, raised when more than ``max_concurrency`` calls
+    are in flight."""
+
+    status_code = 429
+
+
+def load_results(path: str) -> dict[str, dict]:
+    """results.json records keyed by complaint text; {} if the file is missing."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {r["complaint"]: r for r in json.load(f)}
+
+
+def _first_sentence(text: str, max_words: int = 20) -> str:
+    sentence = text.strip().split(". ", 1)[0].rstrip(".")
+    return " ".join(sentence.split()[:max_words]) + "."
+
+
+def _compact_reply(text: str) -> str:
+    """A canned full reply squeezed into the compact format: "WORD: reason"
+    for a verdict, one "HEADER: ..." line per section for a report."""
+    lines = [line.strip() for line in text.strip().split("\n") if line.strip()]
+    headers = [i for i, line in enumerate(lines) if _HEADER_RE.match(line)]
+    if not headers:
+        return f"{lines[0]}: {_first_sentence(' '.join(lines[1:]))}" if len(lines) > 1 else text
+    compact = []
+    for start, end in zip(headers, headers[1:] + [len(lines)]):
+        label, inline = _HEADER_RE.match(lines[start]).groups()
+        points = [line.replace("*", "").lstrip("-0123456789. ") for line in lines[start + 1:end]]
+        body = inline or "; ".join(point for point in points if not point.endswith(":"))
+        compact.append(f"{label}: {body if inline else _first_sentence(body)}")
+    return "\n".join(compact)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model returning canned workflow answers after a simulated delay.
+
+    Latency is drawn per call: ``constant`` always waits ``latency`` seconds,
+    ``normal`` adds Gaussian jitter with standard deviation ``jitter``, and
+    ``lognormal`` has median ``latency`` and log-space sigma ``jitter`` (a
+    long tail, like a real API). Streaming spends ``ttft_fraction`` of the
+    delay before the first token and spreads the rest over the chunks. With
+    ``max_concurrency`` set, calls beyond it fail with a 429 like a
+    provider's capacity limit. Text replies are cut to about ``max_tokens``
+    tokens (4 characters each) and at the first stop sequence, like a
+    provider's, and each output token adds ``token_latency`` seconds.
+    Prompts asking for compact replies (see compact.py) get the canned
+    answer squeezed into the compact format.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    latency: float = 0.5
+    jitter: float = 0.0
+    distribution: str = "constant"
+    error_rate: float = 0.0
+    max_concurrency: int = 0
+    max_tokens: Optional[int] = None
+    temperature: float = 0.0
+    token_latency: float = 0.0
+    ttft_fraction: float = 0.3
+    seed: int = 0
+    results: dict = {}
+    model_name: str = "fake"
+
+    _rng: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _in_flight: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    @classmethod
+    def from_env(cls) -> "FakeChatModel":
+        """Build from FAKE_LLM_* settings."""
+        return cls(
+            latency=float(os.environ.get("FAKE_LLM_LATENCY", "0.5")),
+            jitter=float(os.environ.get("FAKE_LLM_JITTER", "0")),
+            distribution=os.environ.get("FAKE_LLM_DISTRIBUTION", "constant"),
+            error_rate=float(os.environ.get("FAKE_LLM_ERROR_RATE", "0")),
+            max_concurrency=int(os.environ.get("FAKE_LLM_MAX_CONCURRENCY", "0")),
+            token_latency=float(os.environ.get("FAKE_LLM_TOKEN_LATENCY", "0")),
+            seed=int(os.environ.get("FAKE_LLM_SEED", "0")),
+            results=load_results(os.environ.get("FAKE_LLM_RESULTS", "results.json")),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    # --- simulated behaviour ---
+
+    def _draw(self) -> tuple[float, bool]:
+        """(delay in seconds, whether this call fails)."""
+        with self._lock:
+            if self.distribution == "lognormal" and self.latency > 0:
+                delay = self._rng.lognormvariate(math.log(self.latency), self.jitter)
+            elif self.distribution == "normal":
+                delay = self._rng.gauss(self.latency, self.jitter)
+            else:
+                delay = self.latency
+            fail = self._rng.random() < self.error_rate
+        return max(0.0, delay), fail
+
+    @contextmanager
+    def _capacity(self):
+        """Count the call as in flight; 429 if that exceeds max_concurrency."""
+        with self._lock:
+            self._in_flight += 1
+            over = self.max_concurrency and self._in_flight > self.max_concurrency
+        try:
+            if over:
+                raise FakeRateLimitError("Simulated rate limit (429)")
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _lookup(self, prompt: str) -> tuple[str, dict, list[str]]:
+        """(complaint, its results.json record, its categories) for a prompt."""
+        match = _COMPLAINT_RE.search(prompt)
+        complaint = match.group(1).strip() if match else ""
+        record = self.results.get(complaint, {})
+        return complaint, record, record.get("categories") or rule_labels(complaint) or ["other"]
+
+    def _respond(
+        self,
+        messages: list[BaseMessage],
+        tools: Optional[list] = None,
+        max_tokens: Optional[int] = None,
+        stop: Optional[list[str]] = None,
+    ) -> AIMessage:
+        prompt = str(messages[-1].content)
+        complaint, record, categories = self._lookup(prompt)
+
+        if tools and "validate it for each category" in prompt:
+            verdicts = [
+                {"category": c, "verdict": self._verdict(record, complaint, c)[0], "reason": "Canned verdict."}
+                for c in categories if c != "other"
+            ]
+            message = self._tool_call(tools, {"verdicts": verdicts})
+        elif tools and _ITEM_RE.search(prompt):
+            # A micro-batch (see batching.py): answer each numbered prompt.
+            answers = []
+            for number, item in zip(_ITEM_RE.findall(prompt), _ITEM_RE.split(prompt)[2::2]):
+                answer, reason = split_verdict(self._reply(item.strip()))
+                answers.append({"item": int(number), "answer": answer, "reason": reason})
+            message = self._tool_call(tools, {"answers": answers})
+        else:
+            text = self._reply(prompt)
+            for sequence in stop or ():
+                text = text.split(sequence, 1)[0]
+            max_tokens = max_tokens or self.max_tokens
+            message = AIMessage(content=text[: max_tokens * 4] if max_tokens else text)
+        message.usage_metadata = {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(str(message.content) or json.dumps(message.tool_calls)) // 4,
+            "total_tokens": (len(prompt) + len(str(message.content))) // 4,
+        }
+        message.response_metadata = {"model_name": self.model_name}
+        return message
+
+    def _reply(self, prompt: str) -> str:
+        text = self._text(prompt, *self._lookup(prompt))
+        return _compact_reply(text) if REPLY_TERSELY in prompt else text
+
+    @staticmethod
+    def _tool_call(tools: list, args: dict) -> AIMessage:
+        name = tools[0]["function"]["name"]
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": "call_fake"}])
+
+    @staticmethod
+    def _verdict(record: dict, complaint: str, category: str) -> tuple[str, str]:
+        result = record.get("validation_results", {}).get(category)
+        if result:
+            return ("VALID" if result["status"] == "valid" else "REJECT"), result["message"]
+        if category in rule_labels(complaint):
+            return "VALID", "The complaint describes specific, observable details."
+        return "REJECT", "The complaint lacks category-specific detail."
+
+    def _text(self, prompt: str, complaint: str, record: dict, categories: list[str]) -> str:
+        if prompt.startswith("Categorize this"):
+            return ",".join(categories)
+        if prompt.startswith("You are validating"):
+            category = _CATEGORY_RE.search(prompt).group(1)
+            return "\n".join(self._verdict(record, complaint, category))
+        if prompt.startswith("You are investigating"):
+            category = _CATEGORY_RE.search(prompt).group(1)
+            findings = record.get("investigation_findings", {}).get(category)
+            return findings or (
+                f"EVIDENCE GATHERED:\n- Reports consistent with a {category} anomaly\n\n"
+                f"ANALYSIS:\nThe described pattern matches known {category} activity.\n\n"
+                f"CONCLUSION:\nStandard {category} procedures apply."
+            )
+        if prompt.startswith("You are resolving"):
+            return record.get("resolution") or (
+                "RESOLUTION:\nPer Downside Up Protocol DU-100, apply the standard procedure "
+                "for the reported anomaly and monitor the area.\n\n"
+                "ESCALATION: NO\n\nEFFECTIVENESS: MEDIUM"
+            )
+        if "closure agent" in prompt:
+            if record and not record.get("satisfaction_verified", True):
+                return "UNSATISFIED\nThe resolution does not fully address the complaint."
+            return "SATISFIED\nThe resolution addresses the complaint."
+        return "OK"
+
+    # --- BaseChatModel hooks ---
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        delay, fail = self._draw()
+        message = self._respond(messages, tools, kwargs.get("max_tokens"), stop)
+        with self._capacity():
+            time.sleep(delay + self._generation_time(message.usage_metadata))
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        delay, fail = self._draw()
+        message = self._respond(messages, tools, kwargs.get("max_tokens"), stop)
+        with self._capacity():
+            await asyncio.sleep(delay + self._generation_time(message.usage_metadata))
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generation_time(self, usage: dict) -> float:
+        return usage["output_tokens"] * self.token_latency
+
+    def _chunk_wait(self, index: int, count: int, delay: float) -> float:
+        """Pause before chunk ``index`` so the stream ends after ``delay``.
+
+        Chunks are released in batches of at least 10ms rather than one
+        sleep per word, whose scheduling overhead would dominate.
+        """
+        step = delay * (1 - self.ttft_fraction) / count
+        batch = max(1, math.ceil(0.01 / step)) if step > 0 else count
+        return step * batch if index and index % batch == 0 else 0.0
+
+    def _chunks(self, messages, max_tokens: Optional[int] = None, stop=None) -> tuple[dict, list[str]]:
+        message = self._respond(messages, max_tokens=max_tokens, stop=stop)
+        pieces = re.findall(r"\S+\s*", str(message.content)) or [""]
+        return message.usage_metadata, pieces
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        delay, fail = self._draw()
+        usage, pieces = self._chunks(messages, kwargs.get("max_tokens"), stop)
+        delay += self._generation_time(usage)
+        with self._capacity():
+            time.sleep(delay * self.ttft_fraction)
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+        for i, piece in enumerate(pieces):
+            time.sleep(self._chunk_wait(i, len(pieces), delay))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        delay, fail = self._draw()
+        usage, pieces = self._chunks(messages, kwargs.get("max_tokens"), stop)
+        delay += self._generation_time(usage)
+        with self._capacity():
+            await asyncio.sleep(delay * self.ttft_fraction)
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+        for i, piece in enumerate(pieces):
+            await asyncio.sleep(self._chunk_wait(i, len(pieces), delay))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
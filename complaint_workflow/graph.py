@@ -1,16 +1,75 @@
+import os
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import Send
 
-from complaint_workflow.state import ComplaintState
+from complaint_workflow.metrics import instrument
+from complaint_workflow.state import (
+    ComplaintState,
+    CategoryValidationState,
+    CategoryInvestigationState,
+)
 from complaint_workflow.nodes import (
     intake_node,
+    aintake_node,
+    validate_category_node,
+    avalidate_category_node,
     validation_node,
+    triage_node,
+    atriage_node,
     investigate_category_node,
+    ainvestigate_category_node,
+    speculate_category_node,
+    aspeculate_category_node,
+    speculation_node,
     resolution_node,
+    aresolution_node,
     closure_node,
+    aclosure_node,
 )
 
 
+def _node(name: str, func, afunc=None) -> RunnableLambda:
+    """Pair a sync node with its async twin, both timed under ``name``.
+
+    invoke/stream run ``func``; ainvoke/astream await ``afunc`` on the event
+    loop instead of pushing the sync node onto a worker thread. See
+    metrics.instrument for what is recorded.
+    """
+    timed, atimed = instrument(name, func, afunc)
+    return RunnableLambda(timed, afunc=atimed, name=func.__name__)
+
+
+def fan_out_validations(state: ComplaintState, node: str = "validate_category"):
+    """Fan out to parallel validations, one per intake category.
+
+    The verdicts are merged into validation_results before 'validate'
+    combines them into the overall status.
+    """
+    return [
+        Send(
+            node,
+            {
+                "complaint": state["complaint"],
+                "category": cat,
+                "deadline": state.get("deadline", 0.0),
+            },
+        )
+        for cat in state["categories"]
+    ]
+
+
+def fan_out_speculations(state: ComplaintState):
+    """Speculative mode: validate and investigate every intake category at once."""
+    return fan_out_validations(state, node="speculate_category")
+
+
+def route_after_speculation(state: ComplaintState):
+    """Speculative mode: resolve if any investigation was kept, else close."""
+    return "resolve" if state.get("investigation_findings") else "close"
+
+
 def fan_out_investigations(state: ComplaintState):
     """Fan out to parallel investigations for each valid category.
 
@@ -30,37 +89,96 @@ def fan_out_investigations(state: ComplaintState):
     return [
         Send(
             "investigate_category",
-            {"complaint": state["complaint"], "category": cat},
+            {
+                "complaint": state["complaint"],
+                "category": cat,
+                "deadline": state.get("deadline", 0.0),
+            },
         )
         for cat in valid_categories
     ]
 
 
-def build_workflow() -> StateGraph:
-    """Build the workflow StateGraph (not yet compiled)."""
+def build_workflow(
+    combined_triage: bool | None = None, speculative: bool | None = None
+) -> StateGraph:
+    """Build the workflow StateGraph (not yet compiled).
+
+    With ``combined_triage`` (default: the COMBINED_TRIAGE env var), a single
+    structured 'triage' call replaces intake and the per-category
+    validations, saving one LLM round trip per complaint.
+
+    With ``speculative`` (default: the SPECULATIVE_INVESTIGATION env var),
+    each category's investigation starts alongside its validation and is
+    cancelled or discarded if the category is rejected, trading tokens for
+    latency (see speculation_stats).
+    """
+    if combined_triage is None:
+        combined_triage = os.environ.get("COMBINED_TRIAGE", "0") == "1"
+    if speculative is None:
+        speculative = os.environ.get("SPECULATIVE_INVESTIGATION", "0") == "1"
+    if combined_triage and speculative:
+        raise ValueError("Combined triage and speculative investigation cannot be combined")
     workflow = StateGraph(ComplaintState)
 
-    workflow.add_node("intake", intake_node)
-    workflow.add_node("validate", validation_node)
-    workflow.add_node("investigate_category", investigate_category_node)
-    workflow.add_node("resolve", resolution_node)
-    workflow.add_node("close", closure_node)
-
-    workflow.add_edge(START, "intake")
-    workflow.add_edge("intake", "validate")
-    workflow.add_conditional_edges(
-        "validate", fan_out_investigations, ["investigate_category", "close"]
-    )
-    workflow.add_edge("investigate_category", "resolve")
+    if combined_triage:
+        workflow.add_node("triage", _node("triage", triage_node, atriage_node))
+    elif speculative:
+        workflow.add_node("intake", _node("intake", intake_node, aintake_node))
+        workflow.add_node(
+            "speculate_category",
+            _node("speculate_category", speculate_category_node, aspeculate_category_node),
+            input_schema=CategoryValidationState,
+        )
+        workflow.add_node("validate", _node("validate", speculation_node))
+    else:
+        workflow.add_node("intake", _node("intake", intake_node, aintake_node))
+        workflow.add_node(
+            "validate_category",
+            _node("validate_category", validate_category_node, avalidate_category_node),
+            input_schema=CategoryValidationState,
+        )
+    if not speculative:
+        workflow.add_node("validate", _node("validate", validation_node))
+        workflow.add_node(
+            "investigate_category",
+            _node("investigate_category", investigate_category_node, ainvestigate_category_node),
+            input_schema=CategoryInvestigationState,
+        )
+    workflow.add_node("resolve", _node("resolve", resolution_node, aresolution_node))
+    workflow.add_node("close", _node("close", closure_node, aclosure_node))
+
+    if combined_triage:
+        workflow.add_edge(START, "triage")
+        workflow.add_edge("triage", "validate")
+    elif speculative:
+        workflow.add_edge(START, "intake")
+        workflow.add_conditional_edges("intake", fan_out_speculations, ["speculate_category"])
+        workflow.add_edge("speculate_category", "validate")
+    else:
+        workflow.add_edge(START, "intake")
+        workflow.add_conditional_edges("intake", fan_out_validations, ["validate_category"])
+        workflow.add_edge("validate_category", "validate")
+    if speculative:
+        workflow.add_conditional_edges("validate", route_after_speculation, ["resolve", "close"])
+    else:
+        workflow.add_conditional_edges(
+            "validate", fan_out_investigations, ["investigate_category", "close"]
+        )
+        workflow.add_edge("investigate_category", "resolve")
     workflow.add_edge("resolve", "close")
     workflow.add_edge("close", END)
 
     return workflow
 
 
-def compile_graph(checkpointer=None):
+def compile_graph(
+    checkpointer=None,
+    combined_triage: bool | None = None,
+    speculative: bool | None = None,
+):
     """Compile the workflow with an optional checkpointer."""
-    return build_workflow().compile(checkpointer=checkpointer)
+    return build_workflow(combined_triage, speculative).compile(checkpointer=checkpointer)
 
 
 app = compile_graph()
@@ -1,7 +1,190 @@
+import functools
 import os
-from langchain_openai import ChatOpenAI
+from typing import Any, Optional
 
-llm = ChatOpenAI(
-    model=os.environ.get("OPENAI_MODEL", "gpt-4o"),
-    temperature=0,
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+
+from complaint_workflow import callpolicy
+from complaint_workflow.cache import SQLiteLLMCache
+from complaint_workflow.models import ModelSpec, model_spec
+from complaint_workflow.ratelimit import (
+    DEFAULT_PRIORITY,
+    STAGE_PRIORITY,
+    AdaptiveLimiter,
+    Ticket,
+    current_ticket,
 )
+
+# Shared on-disk response cache, opened with the first OpenAI model; None
+# when disabled with LLM_CACHE=0 or when only the fake backend is used.
+llm_cache: Optional[SQLiteLLMCache] = None
+
+# Shared rate limiter / adaptive concurrency limit; None with LLM_LIMIT=0.
+limiter = AdaptiveLimiter.from_env()
+
+# Output tokens assumed per call when reserving token-per-minute budget; the
+# difference is returned once the response reports its real usage.
+OUTPUT_TOKEN_ESTIMATE = 300
+
+
+def _build_llm():
+    """The shared chat model: OpenAI, or the offline fake with LLM_BACKEND=fake."""
+    if os.environ.get("LLM_BACKEND", "openai") == "fake":
+        from complaint_workflow.fake_llm import FakeChatModel
+
+        model = FakeChatModel.from_env()
+        model.rate_limiter = limiter
+        return model
+
+    from langchain_openai import ChatOpenAI
+
+    global llm_cache
+    if llm_cache is None:
+        llm_cache = SQLiteLLMCache.from_env()
+    spec = model_spec(None)
+    return ChatOpenAI(
+        model=spec.model,
+        temperature=spec.temperature,
+        max_tokens=spec.max_tokens,
+        cache=llm_cache,
+        rate_limiter=limiter,
+        # Retries are left to callpolicy, which also sees timeouts and
+        # applies per-node settings.
+        max_retries=0,
+    )
+
+
+llm = _build_llm()
+# Variants of llm for per-node settings (see models.py), derived on first use.
+_node_llms: dict[ModelSpec, BaseChatModel] = {}
+
+
+def _derive(base: BaseChatModel, spec: ModelSpec, defaults: ModelSpec) -> BaseChatModel:
+    """A copy of ``base`` with the settings where ``spec`` differs from
+    ``defaults``, sharing its client, cache and limiter. The rest stay as
+    ``base`` has them (a model passed to set_llm keeps its own name), and
+    settings the model class has no field for are skipped."""
+    fields = type(base).model_fields
+    update = {
+        field: getattr(spec, key)
+        for field, key in (("model_name", "model"), ("max_tokens", "max_tokens"), ("temperature", "temperature"))
+        if getattr(spec, key) != getattr(defaults, key)
+    }
+    return base.model_copy(update={k: v for k, v in update.items() if k in fields})
+
+
+def get_llm(node: Optional[str] = None):
+    """The chat model for graph node ``node`` (default: the shared model).
+
+    Looked up on every call, so set_llm() takes effect for graphs that are
+    already compiled. A node configured like the defaults gets the shared
+    model itself.
+    """
+    base = llm
+    if node is None:
+        return base
+    spec, defaults = model_spec(node), model_spec(None)
+    if spec == defaults:
+        return base
+    if spec not in _node_llms:
+        _node_llms[spec] = _derive(base, spec, defaults)
+    return _node_llms[spec]
+
+
+def set_llm(model):
+    """Replace the shared chat model, e.g. with a FakeChatModel for benchmarks.
+
+    Per-node models are derived from the new one from then on.
+    """
+    global llm
+    llm = model
+    _node_llms.clear()
+
+
+def _ticket(node: str, messages: list[BaseMessage]) -> Ticket:
+    chars = sum(len(str(m.content)) for m in messages)
+    return Ticket(
+        node=node,
+        tokens=chars // 4 + OUTPUT_TOKEN_ESTIMATE,
+        priority=STAGE_PRIORITY.get(node, DEFAULT_PRIORITY),
+        holds_slot=True,
+    )
+
+
+def _used_tokens(result: Any) -> Optional[int]:
+    usage = getattr(result, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def _limited_call(node: str, messages: list[BaseMessage], runnable: Runnable, kwargs: dict):
+    if limiter is None:
+        return runnable.invoke(messages, **kwargs)
+    ticket = _ticket(node, messages)
+    reset = current_ticket.set(ticket)
+    try:
+        result = runnable.invoke(messages, **kwargs)
+    except BaseException as exc:
+        limiter.release(ticket, error=exc)
+        raise
+    finally:
+        current_ticket.reset(reset)
+    limiter.release(ticket, used_tokens=_used_tokens(result))
+    return result
+
+
+async def _alimited_call(node: str, messages: list[BaseMessage], runnable: Runnable, kwargs: dict):
+    if limiter is None:
+        return await runnable.ainvoke(messages, **kwargs)
+    ticket = _ticket(node, messages)
+    reset = current_ticket.set(ticket)
+    try:
+        result = await runnable.ainvoke(messages, **kwargs)
+    except BaseException as exc:
+        limiter.release(ticket, error=exc)
+        raise
+    finally:
+        current_ticket.reset(reset)
+    limiter.release(ticket, used_tokens=_used_tokens(result))
+    return result
+
+
+def call_llm(
+    node: str,
+    messages: list[BaseMessage],
+    runnable: Optional[Runnable] = None,
+    deadline: Optional[float] = None,
+    **kwargs,
+):
+    """Invoke ``runnable`` (default: the node's model) on behalf of graph node ``node``.
+
+    Nodes make their LLM calls through here. Each attempt goes through the
+    shared limiter with the node's stage priority and token estimate, and
+    the call as a whole follows the node's timeout/retry/hedging policy
+    (see callpolicy.py), bounded by the complaint's ``deadline``.
+    """
+    runnable = runnable or get_llm(node)
+    return callpolicy.run(
+        node,
+        functools.partial(_limited_call, node, messages, runnable, kwargs),
+        hedgeable=not kwargs.get("stream"),
+        deadline=deadline,
+    )
+
+
+async def acall_llm(
+    node: str,
+    messages: list[BaseMessage],
+    runnable: Optional[Runnable] = None,
+    deadline: Optional[float] = None,
+    **kwargs,
+):
+    """Async twin of call_llm."""
+    runnable = runnable or get_llm(node)
+    return await callpolicy.arun(
+        node,
+        functools.partial(_alimited_call, node, messages, runnable, kwargs),
+        hedgeable=not kwargs.get("stream"),
+        deadline=deadline,
+    )
@@ -0,0 +1,210 @@
+"""Per-node latency and token metrics.
+
+graph.py wraps every node with ``instrument``. Each run of a node is timed,
+the token usage of the LLM calls it makes is summed from the responses'
+``usage_metadata``, and the result is
+
+- aggregated in ``registry`` (per node and category), rendered in the
+  Prometheus text format by ``registry.render()`` for ``GET /metrics``, and
+- appended to the complaint's ``node_metrics`` state, which the server
+  stores per complaint for percentile queries over past runs.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+# Latency histogram buckets in seconds; LLM-bound nodes take 0.5-30s.
+BUCKETS = (0.005, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+class _UsageCollector(BaseCallbackHandler):
+    """Sums usage_metadata of every chat model response it sees."""
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any):
+        for generations in response.generations:
+            for generation in generations:
+                if not isinstance(generation, ChatGeneration):
+                    continue
+                usage = getattr(generation.message, "usage_metadata", None) or {}
+                self.add(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+
+    def add(self, input_tokens: int, output_tokens: int):
+        with self._lock:
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+
+# While a node runs, every LLM call made in its context reports to the node's
+# collector, including calls on worker threads that copy the context.
+_collector: ContextVar[Optional[_UsageCollector]] = ContextVar("node_usage_collector", default=None)
+register_configure_hook(_collector, inheritable=True)
+
+
+def charge(input_tokens: int, output_tokens: int):
+    """Count tokens spent on the current node's behalf by a call it did not
+    make itself, such as its share of a batched call (see batching.py)."""
+    usage = _collector.get()
+    if usage is not None:
+        usage.add(input_tokens, output_tokens)
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters keyed by (node, category)."""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self._latency: dict[tuple[str, str], list] = {}  # key -> [bucket counts, sum, count]
+        self._tokens: dict[tuple[str, str, str], int] = {}
+        self._errors: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        node: str,
+        category: str,
+        seconds: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        error: bool = False,
+    ):
+        key = (node, category)
+        with self._lock:
+            hist = self._latency.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                hist[0][index] += 1
+            hist[1] += seconds
+            hist[2] += 1
+            for kind, count in (("input", input_tokens), ("output", output_tokens)):
+                self._tokens[(node, category, kind)] = self._tokens.get((node, category, kind), 0) + count
+            if error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            latency = {k: (list(v[0]), v[1], v[2]) for k, v in self._latency.items()}
+            tokens = dict(self._tokens)
+            errors = dict(self._errors)
+
+        lines = [
+            "# HELP complaint_node_duration_seconds Wall time of one workflow node run.",
+            "# TYPE complaint_node_duration_seconds histogram",
+        ]
+        for (node, category), (counts, total, count) in sorted(latency.items()):
+            labels = f'node="{node}",category="{category}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'complaint_node_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'complaint_node_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"complaint_node_duration_seconds_sum{{{labels}}} {total}")
+            lines.append(f"complaint_node_duration_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP complaint_node_tokens_total LLM tokens used by workflow nodes.",
+            "# TYPE complaint_node_tokens_total counter",
+        ]
+        for (node, category, kind), count in sorted(tokens.items()):
+            lines.append(
+                f'complaint_node_tokens_total{{node="{node}",category="{category}",type="{kind}"}} {count}'
+            )
+
+        lines += [
+            "# HELP complaint_node_errors_total Workflow node runs that raised.",
+            "# TYPE complaint_node_errors_total counter",
+        ]
+        for (node, category), count in sorted(errors.items()):
+            lines.append(f'complaint_node_errors_total{{node="{node}",category="{category}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _record(node: str, state: dict, started: float, usage: _UsageCollector, update: dict) -> dict:
+    entry = {
+        "node": node,
+        # Per-category nodes receive the category via Send.
+        "category": state.get("category", ""),
+        "seconds": round(time.perf_counter() - started, 4),
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+    }
+    registry.observe(
+        node, entry["category"], entry["seconds"], entry["input_tokens"], entry["output_tokens"]
+    )
+    return {**update, "node_metrics": [entry]}
+
+
+def _record_error(node: str, state: dict, started: float, usage: _UsageCollector):
+    registry.observe(
+        node, state.get("category", ""), time.perf_counter() - started,
+        usage.input_tokens, usage.output_tokens, error=True,
+    )
+
+
+def instrument(node: str, func: Callable, afunc: Optional[Callable] = None):
+    """Wrap a node (and its async twin) to time it and capture token usage.
+
+    The returned functions add a ``node_metrics`` entry to the node's update.
+    """
+
+    @functools.wraps(func)
+    def timed(state):
+        usage = _UsageCollector()
+        reset = _collector.set(usage)
+        started = time.perf_counter()
+        try:
+            update = func(state)
+        except Exception:
+            _record_error(node, state, started, usage)
+            raise
+        finally:
+            _collector.reset(reset)
+        return _record(node, state, started, usage, update)
+
+    if afunc is None:
+        return timed, None
+
+    @functools.wraps(afunc)
+    async def atimed(state):
+        usage = _UsageCollector()
+        reset = _collector.set(usage)
+        started = time.perf_counter()
+        try:
+            update = await afunc(state)
+        except Exception:
+            _record_error(node, state, started, usage)
+            raise
+        finally:
+            _collector.reset(reset)
+        return _record(node, state, started, usage, update)
+
+    return timed, atimed
+
+
+def percentiles(values: list[float], points: tuple[int, ...] = (50, 95, 99)) -> dict:
+    """Nearest-rank percentiles of ``values`` as {"p50": ..., ...}."""
+    ordered = sorted(values)
+    if not ordered:
+        return {f"p{p}": None for p in points}
+    return {
+        f"p{p}": ordered[max(0, min(len(ordered) - 1, -(-p * len(ordered) // 100) - 1))]
+        for p in points
+    }
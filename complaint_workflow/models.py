@@ -0,0 +1,80 @@
+"""Per-node model settings: which model each node calls, with what limits.
+
+Cheap one-word steps (validation, closure) can run on a smaller, faster
+model than the investigation reports. Each node (by its call_llm name:
+intake, triage, validate_category, investigate_category, resolve, close)
+resolves a ``ModelSpec`` from, in order of precedence:
+
+1. ``LLM_MODEL_<NODE>``, ``LLM_MAX_TOKENS_<NODE>``, ``LLM_TEMPERATURE_<NODE>``
+2. the node's entry in the JSON file named by ``LLM_MODELS_FILE``
+   (then, in compact mode, the node's max_tokens from compact.py)
+3. ``OPENAI_MODEL``, ``LLM_MAX_TOKENS``, ``LLM_TEMPERATURE``
+4. the file's ``"default"`` entry
+5. gpt-4o, no token limit, temperature 0
+
+Example file (see models.example.json)::
+
+    {
+      "default": {"model": "gpt-4o"},
+      "validate_category": {"model": "gpt-4o-mini", "max_tokens": 60},
+      "close": {"model": "gpt-4o-mini", "max_tokens": 60}
+    }
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from complaint_workflow.compact import COMPACT_MAX_TOKENS, compact_enabled
+
+_ENV_DEFAULTS = {"model": "OPENAI_MODEL", "max_tokens": "LLM_MAX_TOKENS", "temperature": "LLM_TEMPERATURE"}
+_ENV_PREFIXES = {"model": "LLM_MODEL", "max_tokens": "LLM_MAX_TOKENS", "temperature": "LLM_TEMPERATURE"}
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    model: str = "gpt-4o"
+    max_tokens: Optional[int] = None
+    temperature: float = 0.0
+
+
+def load_models_file(path: str) -> dict[str, dict]:
+    """Per-node settings from a JSON file; {} if unset or missing."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _convert(key: str, value):
+    if key == "max_tokens":
+        return int(value) if value not in (None, "", 0, "0") else None
+    if key == "temperature":
+        return float(value)
+    return str(value)
+
+
+def model_spec(node: Optional[str], config: Optional[dict] = None) -> ModelSpec:
+    """The model settings for ``node`` (None: the defaults)."""
+    config = _models_file if config is None else config
+    settings = {}
+    for key in ("model", "max_tokens", "temperature"):
+        candidates = []
+        if node:
+            candidates += [
+                os.environ.get(f"{_ENV_PREFIXES[key]}_{node.upper()}"),
+                config.get(node, {}).get(key),
+            ]
+            if key == "max_tokens" and compact_enabled():
+                candidates.append(COMPACT_MAX_TOKENS.get(node))
+        candidates += [os.environ.get(_ENV_DEFAULTS[key]), config.get("default", {}).get(key)]
+        value = next((c for c in candidates if c is not None), None)
+        if value is not None:
+            settings[key] = _convert(key, value)
+    return ModelSpec(**settings)
+
+
+_models_file = load_models_file(os.environ.get("LLM_MODELS_FILE", ""))
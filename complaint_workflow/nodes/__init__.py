@@ -1,13 +1,39 @@
-from complaint_workflow.nodes.intake import intake_node
-from complaint_workflow.nodes.validation import validation_node
-from complaint_workflow.nodes.investigation import investigate_category_node
-from complaint_workflow.nodes.resolution import resolution_node
-from complaint_workflow.nodes.closure import closure_node
+from complaint_workflow.nodes.intake import intake_node, aintake_node
+from complaint_workflow.nodes.validation import (
+    validate_category_node,
+    avalidate_category_node,
+    validation_node,
+)
+from complaint_workflow.nodes.triage import triage_node, atriage_node
+from complaint_workflow.nodes.investigation import (
+    investigate_category_node,
+    ainvestigate_category_node,
+)
+from complaint_workflow.nodes.speculation import (
+    speculate_category_node,
+    aspeculate_category_node,
+    speculation_node,
+    speculation_stats,
+)
+from complaint_workflow.nodes.resolution import resolution_node, aresolution_node
+from complaint_workflow.nodes.closure import closure_node, aclosure_node
 
 __all__ = [
     "intake_node",
+    "aintake_node",
+    "validate_category_node",
+    "avalidate_category_node",
     "validation_node",
+    "triage_node",
+    "atriage_node",
     "investigate_category_node",
+    "ainvestigate_category_node",
+    "speculate_category_node",
+    "aspeculate_category_node",
+    "speculation_node",
+    "speculation_stats",
     "resolution_node",
+    "aresolution_node",
     "closure_node",
+    "aclosure_node",
 ]
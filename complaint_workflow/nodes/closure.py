@@ -1,15 +1,24 @@
+import logging
 from datetime import datetime
 
-from langchain_core.messages import HumanMessage
-
 from complaint_workflow.state import ComplaintState
-from complaint_workflow.llm import llm
-
-
-def closure_node(state: ComplaintState) -> dict:
-    """Step 5: Closure - Verify resolution, log outcome, and close the complaint"""
-    print("\n[CLOSURE] Processing closure...")
-
+from complaint_workflow.batching import acomplete, complete
+from complaint_workflow.compact import compact_enabled, compact_verdict_format, split_verdict, stop_kwargs
+from complaint_workflow.eventlog import emit
+from complaint_workflow.deadline import current_deadline, should_degrade
+
+CLOSURE_BLOCKED = {
+    "closure_log": "",
+    "satisfaction_verified": False,
+    "follow_up_required": False,
+    "closed_at": "",
+    "workflow_path": ["closure_blocked"],
+    "status": "closure_blocked",
+}
+
+
+def _check_closable(state: ComplaintState) -> bool:
+    """Return True if every prerequisite step ran and a resolution exists."""
     workflow_path = state.get("workflow_path", [])
 
     # Check required sequential steps and at least one investigation
@@ -21,50 +30,57 @@ def closure_node(state: ComplaintState) -> dict:
         missing = [s for s in required_steps if s not in workflow_path]
         if not has_investigation:
             missing.append("investigation")
-        print(f"[CLOSURE] Cannot close - missing steps: {missing}")
-        return {
-            "closure_log": "",
-            "satisfaction_verified": False,
-            "follow_up_required": False,
-            "closed_at": "",
-            "workflow_path": ["closure_blocked"],
-            "status": "closure_blocked",
-        }
+        emit("closure", "blocked", logging.WARNING, reason="missing steps", missing=missing)
+        return False
 
     if not state.get("resolution"):
-        print("[CLOSURE] Cannot close - no resolution was applied")
-        return {
-            "closure_log": "",
-            "satisfaction_verified": False,
-            "follow_up_required": False,
-            "closed_at": "",
-            "workflow_path": ["closure_blocked"],
-            "status": "closure_blocked",
-        }
-
-    complaint = state["complaint"]
-    categories = state.get("categories", [])
-    categories_label = ", ".join(categories)
-    resolution = state["resolution"]
-    effectiveness = state.get("effectiveness_rating", "medium")
+        emit("closure", "blocked", logging.WARNING, reason="no resolution was applied")
+        return False
+
+    return True
+
+
+def _satisfaction_prompt(state: ComplaintState) -> str:
+    categories_label = ", ".join(state.get("categories", []))
+    if compact_enabled():
+        answer_format = compact_verdict_format("SATISFIED or UNSATISFIED")
+    else:
+        answer_format = (
+            "Respond with EXACTLY one word: SATISFIED or UNSATISFIED\n"
+            "Then on a new line, provide a brief explanation."
+        )
 
-    satisfaction_prompt = f"""You are a Downside Up closure agent verifying customer satisfaction.
+    return f"""You are a Downside Up closure agent verifying customer satisfaction.
 
-Original complaint: {complaint}
+Original complaint: {state["complaint"]}
 Categories: {categories_label}
-Resolution applied: {resolution}
+Resolution applied: {state["resolution"]}
 
 Based on the resolution provided, assess whether this resolution adequately addresses the customer's complaint.
-Respond with EXACTLY one word: SATISFIED or UNSATISFIED
-Then on a new line, provide a brief explanation."""
+{answer_format}"""
 
-    response = llm.invoke([HumanMessage(content=satisfaction_prompt)])
-    result = response.content.strip()
-    first_line = result.split("\n")[0].strip().upper()
-    satisfaction_reason = "\n".join(result.split("\n")[1:]).strip()
 
-    satisfied = first_line == "SATISFIED"
-    follow_up_required = effectiveness == "low"
+def _closure_update(state: ComplaintState, content: str | None) -> dict:
+    """Close the complaint; ``content`` is the satisfaction check's answer,
+    or None if the check was skipped for the deadline."""
+    workflow_path = state.get("workflow_path", [])
+    categories_label = ", ".join(state.get("categories", []))
+    resolution = state["resolution"]
+    effectiveness = state.get("effectiveness_rating", "medium")
+
+    degraded = content is None
+    if degraded:
+        # Unverified: nobody checked the resolution, so schedule a follow-up.
+        outcome = "Unverified"
+        satisfaction_reason = "Satisfaction check skipped: the complaint's deadline was reached."
+        satisfied = False
+        follow_up_required = True
+    else:
+        verdict, satisfaction_reason = split_verdict(content)
+        satisfied = verdict == "SATISFIED"
+        outcome = "Satisfied" if satisfied else "Unsatisfied"
+        follow_up_required = effectiveness == "low"
+    degraded_steps = state.get("degraded_steps", []) + (["closure"] if degraded else [])
 
     timestamp = datetime.now().isoformat()
 
@@ -81,18 +97,22 @@ Then on a new line, provide a brief explanation."""
         f"Categories: {categories_label}\n"
         f"Investigated: {', '.join(investigated)} (parallel)\n"
         f"Resolution: {resolution}\n"
-        f"Outcome: {'Satisfied' if satisfied else 'Unsatisfied'}\n"
+        f"Outcome: {outcome}\n"
         f"Satisfaction Detail: {satisfaction_reason}\n"
         f"Effectiveness Rating: {effectiveness}\n"
         f"Follow-up Required: {'Yes - 30-day checkpoint scheduled' if follow_up_required else 'No'}\n"
         f"Workflow Path: {' -> '.join(workflow_path + ['closure'])}\n"
+        f"Degraded Steps: {', '.join(degraded_steps) or 'None'}\n"
         f"=============================="
     )
 
-    print(f"[CLOSURE] Satisfaction: {'SATISFIED' if satisfied else 'UNSATISFIED'}")
-    if follow_up_required:
-        print("[CLOSURE] Low effectiveness - 30-day follow-up checkpoint scheduled")
-    print(f"[CLOSURE] Complaint closed at {timestamp}")
+    emit(
+        "closure",
+        "closed",
+        satisfied="unverified" if degraded else satisfied,
+        follow_up_required=follow_up_required,
+        closed_at=timestamp,
+    )
 
     return {
         "closure_log": closure_log,
@@ -101,4 +121,35 @@ Then on a new line, provide a brief explanation."""
         "closed_at": timestamp,
         "workflow_path": ["closure"],
         "status": "closed",
+        "degraded_steps": ["closure"] if degraded else [],
     }
+
+
+def closure_node(state: ComplaintState) -> dict:
+    """Step 5: Closure - Verify resolution, log outcome, and close the complaint"""
+    emit("closure", "started", logging.DEBUG)
+
+    if not _check_closable(state):
+        return dict(CLOSURE_BLOCKED)
+
+    if should_degrade(state, "close"):
+        return _closure_update(state, None)
+
+    prompt = _satisfaction_prompt(state)
+    content = complete("close", prompt, deadline=current_deadline(state), **stop_kwargs("close"))
+    return _closure_update(state, content)
+
+
+async def aclosure_node(state: ComplaintState) -> dict:
+    """Async twin of closure_node, used when the graph runs via ainvoke/astream."""
+    emit("closure", "started", logging.DEBUG)
+
+    if not _check_closable(state):
+        return dict(CLOSURE_BLOCKED)
+
+    if should_degrade(state, "close"):
+        return _closure_update(state, None)
+
+    prompt = _satisfaction_prompt(state)
+    content = await acomplete("close", prompt, deadline=current_deadline(state), **stop_kwargs("close"))
+    return _closure_update(state, content)
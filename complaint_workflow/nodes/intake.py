@@ -1,18 +1,19 @@
+import logging
+
 from langchain_core.messages import HumanMessage
 
+from complaint_workflow.classifier import LABELS, intake_classifier
 from complaint_workflow.state import ComplaintState
-from complaint_workflow.llm import llm
-
-VALID_CATEGORIES = {"portal", "monster", "psychic", "environmental"}
-
+from complaint_workflow.llm import acall_llm, call_llm
+from complaint_workflow.eventlog import emit
+from complaint_workflow.deadline import current_deadline
+from complaint_workflow.compact import stop_kwargs
 
-def intake_node(state: ComplaintState) -> dict:
-    """Step 1: Intake - Parse and categorize the complaint into one or more categories"""
-    print("\n[INTAKE] Processing complaint...")
+VALID_CATEGORIES = set(LABELS)
 
-    complaint = state["complaint"]
 
-    categorization_prompt = f"""Categorize this Downside Up complaint. A complaint may involve MULTIPLE categories.
+def _categorization_prompt(complaint: str) -> str:
+    return f"""Categorize this Downside Up complaint. A complaint may involve MULTIPLE categories.
 
 Categories:
 - portal: Issues with portal timing, location, or behavior
@@ -25,15 +26,58 @@ Complaint: {complaint}
 Return ONLY the matching category names separated by commas (e.g. portal,monster).
 If none of the categories match, respond with: other"""
 
-    response = llm.invoke([HumanMessage(content=categorization_prompt)])
-    raw = response.content.strip().lower()
+
+def _intake_update(content: str, categorized_by: str = "llm") -> dict:
+    raw = content.strip().lower()
     categories = [c.strip() for c in raw.split(",") if c.strip() in VALID_CATEGORIES]
     if not categories:
         categories = ["other"]
 
-    print(f"[INTAKE] Categorized as: {', '.join(categories)}")
+    emit("intake", "categorized", categories=categories, categorized_by=categorized_by)
     return {
         "categories": categories,
+        "categorized_by": categorized_by,
         "workflow_path": ["intake"],
         "status": "intake",
     }
+
+
+def _local_update(complaint: str) -> dict | None:
+    """Categorize without the LLM when the local classifier is confident."""
+    if intake_classifier is None:
+        return None
+    prediction = intake_classifier.classify(complaint)
+    if prediction is None:
+        return None
+    emit("intake", "classified locally", by=prediction.source, confidence=round(prediction.confidence, 2))
+    return _intake_update(",".join(prediction.categories), categorized_by=prediction.source)
+
+
+def intake_node(state: ComplaintState) -> dict:
+    """Step 1: Intake - Parse and categorize the complaint into one or more categories"""
+    emit("intake", "started", logging.DEBUG)
+
+    local = _local_update(state["complaint"])
+    if local:
+        return local
+
+    prompt = _categorization_prompt(state["complaint"])
+    response = call_llm(
+        "intake", [HumanMessage(content=prompt)], deadline=current_deadline(state), **stop_kwargs("intake")
+    )
+    return _intake_update(response.content)
+
+
+async def aintake_node(state: ComplaintState) -> dict:
+    """Async twin of intake_node, used when the graph runs via ainvoke/astream."""
+    emit("intake", "started", logging.DEBUG)
+
+    local = _local_update(state["complaint"])
+    if local:
+        return local
+
+    prompt = _categorization_prompt(state["complaint"])
+    response = await acall_llm(
+        "intake", [HumanMessage(content=prompt)], deadline=current_deadline(state), **stop_kwargs("intake")
+    )
+    return _intake_update(response.content)
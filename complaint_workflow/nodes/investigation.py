@@ -1,17 +1,40 @@
+import logging
+
 from langchain_core.messages import HumanMessage
 
 from complaint_workflow.state import CategoryInvestigationState
-from complaint_workflow.llm import llm
+from complaint_workflow.llm import acall_llm, call_llm
+from complaint_workflow.eventlog import emit
+from complaint_workflow.deadline import current_deadline, should_degrade
+from complaint_workflow.compact import REPLY_TERSELY, compact_enabled
+from complaint_workflow.models import model_spec
 
+# Near the complaint's deadline the report is cut down to a few lines.
+BRIEF_MAX_TOKENS = 250
+BRIEF_INSTRUCTION = (
+    "\n\nTime is short: list at most three evidence points, "
+    "and keep ANALYSIS and CONCLUSION to one line each."
+)
 
-def investigate_category_node(state: CategoryInvestigationState) -> dict:
-    """Investigate a single category in parallel. Receives minimal state via Send."""
-    complaint = state["complaint"]
-    category = state["category"]
+REPORT_FORMAT = """Produce a structured investigation report with documented evidence and findings. Format it as:
 
-    print(f"\n[INVESTIGATION:{category.upper()}] Starting investigation...")
+EVIDENCE GATHERED:
+- [list key evidence points]
 
-    investigation_prompt = f"""You are investigating a validated Downside Up complaint categorized as "{category}".
+ANALYSIS:
+[brief analysis of the evidence]
+
+CONCLUSION:
+[summary finding that can inform resolution]"""
+
+COMPACT_REPORT_FORMAT = f"""{REPLY_TERSELY}, in exactly three lines:
+EVIDENCE GATHERED: [key evidence points, separated by semicolons]
+ANALYSIS: [one sentence]
+CONCLUSION: [one sentence that can inform resolution]"""
+
+
+def _investigation_prompt(complaint: str, category: str) -> str:
+    return f"""You are investigating a validated Downside Up complaint categorized as "{category}".
 
 Follow the investigation protocol for "{category}":
 
@@ -22,23 +45,48 @@ Follow the investigation protocol for "{category}":
 
 Complaint: {complaint}
 
-Produce a structured investigation report with documented evidence and findings. Format it as:
+{COMPACT_REPORT_FORMAT if compact_enabled() else REPORT_FORMAT}"""
 
-EVIDENCE GATHERED:
-- [list key evidence points]
 
-ANALYSIS:
-[brief analysis of the evidence]
+def _investigation_request(state: CategoryInvestigationState) -> tuple[str, dict, bool]:
+    """Prompt, call_llm kwargs and whether the investigation runs degraded."""
+    prompt = _investigation_prompt(state["complaint"], state["category"])
+    kwargs = {"deadline": current_deadline(state)}
+    degraded = should_degrade(state, "investigate_category")
+    if degraded:
+        prompt += BRIEF_INSTRUCTION
+        limit = model_spec("investigate_category").max_tokens
+        kwargs["max_tokens"] = min(BRIEF_MAX_TOKENS, limit) if limit else BRIEF_MAX_TOKENS
+    return prompt, kwargs, degraded
 
-CONCLUSION:
-[summary finding that can inform resolution]"""
 
-    response = llm.invoke([HumanMessage(content=investigation_prompt)])
-    findings = response.content.strip()
+def _investigation_update(category: str, content: str, degraded: bool = False) -> dict:
+    findings = content.strip()
 
-    print(f"[INVESTIGATION:{category.upper()}] Investigation complete")
+    emit("investigation", "completed", category=category)
 
     return {
         "investigation_findings": {category: findings},
         "workflow_path": [f"investigation:{category}"],
+        "degraded_steps": [f"investigation:{category}"] if degraded else [],
     }
+
+
+def investigate_category_node(state: CategoryInvestigationState) -> dict:
+    """Investigate a single category in parallel. Receives minimal state via Send."""
+    category = state["category"]
+    emit("investigation", "started", logging.DEBUG, category=category)
+
+    prompt, kwargs, degraded = _investigation_request(state)
+    response = call_llm("investigate_category", [HumanMessage(content=prompt)], **kwargs)
+    return _investigation_update(category, response.content, degraded)
+
+
+async def ainvestigate_category_node(state: CategoryInvestigationState) -> dict:
+    """Async twin of investigate_category_node, used when the graph runs via ainvoke/astream."""
+    category = state["category"]
+    emit("investigation", "started", logging.DEBUG, category=category)
+
+    prompt, kwargs, degraded = _investigation_request(state)
+    response = await acall_llm("investigate_category", [HumanMessage(content=prompt)], **kwargs)
+    return _investigation_update(category, response.content, degraded)
@@ -1,33 +1,55 @@
+import logging
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import HumanMessage
+from langgraph.config import get_stream_writer
 
 from complaint_workflow.state import ComplaintState
-from complaint_workflow.llm import llm
+from complaint_workflow.llm import acall_llm, call_llm, get_llm
+from complaint_workflow.eventlog import emit
+from complaint_workflow.deadline import current_deadline, should_degrade
+from complaint_workflow.compact import REPLY_TERSELY, compact_enabled
+from complaint_workflow.models import model_spec
 
+# Near the complaint's deadline the resolution is cut down to a few sentences.
+BRIEF_MAX_TOKENS = 250
+BRIEF_INSTRUCTION = (
+    "\n\nTime is short: keep the RESOLUTION to at most three sentences, "
+    "and still end with the ESCALATION and EFFECTIVENESS lines."
+)
 
-def resolution_node(state: ComplaintState) -> dict:
-    """Step 4: Resolution - Propose a resolution based on all investigation findings"""
-    print("\n[RESOLUTION] Generating resolution...")
+RESPONSE_FORMAT = """Format your response EXACTLY as:
 
-    findings = state.get("investigation_findings", {})
-    if not findings:
-        print("[RESOLUTION] Cannot proceed - no documented investigation results")
-        return {
-            "resolution": "",
-            "effectiveness_rating": "",
-            "requires_escalation": False,
-            "workflow_path": ["resolution_blocked"],
-            "status": "resolution_blocked",
-        }
-
-    complaint = state["complaint"]
-    categories = list(findings.keys())
-    categories_label = ", ".join(categories)
+RESOLUTION:
+[detailed resolution referencing Downside Up procedures]
+
+ESCALATION: [YES or NO]
+
+EFFECTIVENESS: [HIGH, MEDIUM, or LOW]"""
+
+COMPACT_RESPONSE_FORMAT = f"""{REPLY_TERSELY}, in exactly three lines:
+RESOLUTION: [at most two sentences, citing the Downside Up procedure]
+ESCALATION: [YES or NO]
+EFFECTIVENESS: [HIGH, MEDIUM, or LOW]"""
+
+RESOLUTION_BLOCKED = {
+    "resolution": "",
+    "effectiveness_rating": "",
+    "requires_escalation": False,
+    "workflow_path": ["resolution_blocked"],
+    "status": "resolution_blocked",
+}
+
+
+def _resolution_prompt(complaint: str, findings: dict) -> str:
+    categories_label = ", ".join(findings.keys())
 
     all_findings = "\n\n".join(
         f"--- {cat.upper()} INVESTIGATION ---\n{text}" for cat, text in findings.items()
     )
 
-    resolution_prompt = f"""You are resolving a Downside Up complaint that spans these categories: {categories_label}.
+    return f"""You are resolving a Downside Up complaint that spans these categories: {categories_label}.
 
 Investigation findings across all categories:
 {all_findings}
@@ -40,40 +62,145 @@ Generate a resolution following these rules:
 3. If any category is "environmental" or "monster", determine whether this requires escalation to a specialized team (Hawkins Environmental Response Unit or Creature Containment Division). Set ESCALATION to YES or NO.
 4. Include a predicted effectiveness rating: HIGH, MEDIUM, or LOW based on the evidence strength and resolution fit.
 
-Format your response EXACTLY as:
+{COMPACT_RESPONSE_FORMAT if compact_enabled() else RESPONSE_FORMAT}"""
 
-RESOLUTION:
-[detailed resolution referencing Downside Up procedures]
 
-ESCALATION: [YES or NO]
+class _ResolutionParser:
+    """Reads the ESCALATION:/EFFECTIVENESS: lines as the resolution streams in.
 
-EFFECTIVENESS: [HIGH, MEDIUM, or LOW]"""
+    Each line is parsed once it is complete, so the flags are known as soon
+    as the model writes them rather than after the whole response.
+    """
+
+    def __init__(self, categories: list[str]):
+        self._can_escalate = bool({"environmental", "monster"} & set(categories))
+        self.reset()
+
+    def reset(self):
+        """Forget everything fed so far (the call is being retried)."""
+        self.text = ""
+        self.effectiveness: str | None = None
+        self.requires_escalation: bool | None = None
+        self._parsed_to = 0
+
+    def feed(self, delta: str) -> dict:
+        """Append a streamed delta; return any fields it completed."""
+        self.text += delta
+        line_end = self.text.rfind("\n") + 1
+        if line_end <= self._parsed_to:
+            return {}
+        found = self._parse(self.text[self._parsed_to:line_end])
+        self._parsed_to = line_end
+        return found
+
+    def close(self) -> dict:
+        """Parse the trailing line once the stream has ended."""
+        found = self._parse(self.text[self._parsed_to:])
+        self._parsed_to = len(self.text)
+        return found
+
+    def _parse(self, lines: str) -> dict:
+        found = {}
+        for line in lines.split("\n"):
+            label = line.strip().upper()
+            if label.startswith("EFFECTIVENESS:") and self.effectiveness is None:
+                rating = line.split(":", 1)[1].strip().lower()
+                self.effectiveness = rating if rating in ("high", "medium", "low") else "medium"
+                found["effectiveness_rating"] = self.effectiveness
+            elif label.startswith("ESCALATION:") and self.requires_escalation is None:
+                self.requires_escalation = self._can_escalate and "YES" in label
+                found["requires_escalation"] = self.requires_escalation
+        return found
+
+
+class _TokenRelay(BaseCallbackHandler):
+    """Feeds streamed tokens to the parser and on to the graph's custom stream.
+
+    Streamed clients receive ``resolution_token`` events with each delta and
+    a ``resolution_parsed`` event as soon as a flag line is complete. If the
+    call is retried after streaming part of a response, a
+    ``resolution_reset`` event tells them to discard what they have.
+
+    This is progress reporting only: a timed-out sync attempt is abandoned
+    but keeps running, so tokens from any run but the latest are dropped,
+    and the node saves the text the call returned, not what was relayed.
+    """
 
-    response = llm.invoke([HumanMessage(content=resolution_prompt)])
-    result = response.content.strip()
-
-    # Parse effectiveness rating
-    effectiveness = "medium"
-    for line in result.split("\n"):
-        if line.strip().upper().startswith("EFFECTIVENESS:"):
-            rating = line.split(":", 1)[1].strip().lower()
-            if rating in ("high", "medium", "low"):
-                effectiveness = rating
-            break
-
-    # Parse escalation flag
-    requires_escalation = False
-    escalation_categories = {"environmental", "monster"}
-    if escalation_categories & set(categories):
-        for line in result.split("\n"):
-            if line.strip().upper().startswith("ESCALATION:"):
-                requires_escalation = "YES" in line.upper()
-                break
-
-    print(f"[RESOLUTION] Categories addressed: {categories_label}")
-    print(f"[RESOLUTION] Effectiveness: {effectiveness}")
-    if requires_escalation:
-        print(f"[RESOLUTION] Escalation required")
+    run_inline = True
+
+    def __init__(self, parser: _ResolutionParser):
+        self.parser = parser
+        self.streamed = False
+        self._run_id = None
+        self._lock = threading.Lock()
+        self._write = get_stream_writer()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs):
+        with self._lock:
+            self._run_id = run_id
+            if self.streamed:
+                self._reset()
+
+    def on_llm_new_token(self, token: str, *, run_id=None, **kwargs):
+        with self._lock:
+            if not token or run_id != self._run_id:
+                return
+            self.streamed = True
+            self._relay(token)
+
+    def finish(self, content: str):
+        with self._lock:
+            self._run_id = None
+            # A cache hit (or a model without streaming) delivers no tokens;
+            # relay the full response as a single delta instead. Clients that
+            # saw different text are told to start over.
+            if self.parser.text != content:
+                if self.streamed:
+                    self._reset()
+                self._relay(content)
+            found = self.parser.close()
+            if found:
+                self._write({"event": "resolution_parsed", **found})
+
+    def _reset(self):
+        self.streamed = False
+        self.parser.reset()
+        self._write({"event": "resolution_reset"})
+
+    def _relay(self, delta: str):
+        self._write({"event": "resolution_token", "delta": delta})
+        found = self.parser.feed(delta)
+        if found:
+            self._write({"event": "resolution_parsed", **found})
+
+
+def _resolution_request(state: ComplaintState) -> tuple[str, dict, bool]:
+    """Prompt, call_llm kwargs and whether the resolution runs degraded."""
+    prompt = _resolution_prompt(state["complaint"], state["investigation_findings"])
+    kwargs = {"deadline": current_deadline(state), "stream": True}
+    degraded = should_degrade(state, "resolve")
+    if degraded:
+        prompt += BRIEF_INSTRUCTION
+        limit = model_spec("resolve").max_tokens
+        kwargs["max_tokens"] = min(BRIEF_MAX_TOKENS, limit) if limit else BRIEF_MAX_TOKENS
+    return prompt, kwargs, degraded
+
+
+def _resolution_update(categories: list[str], content: str, degraded: bool = False) -> dict:
+    parser = _ResolutionParser(categories)
+    parser.feed(content)
+    parser.close()
+    result = content.strip()
+    effectiveness = parser.effectiveness or "medium"
+    requires_escalation = bool(parser.requires_escalation)
+
+    emit(
+        "resolution",
+        "resolved",
+        categories=categories,
+        effectiveness=effectiveness,
+        requires_escalation=requires_escalation,
+    )
 
     return {
         "resolution": result,
@@ -81,4 +208,53 @@ EFFECTIVENESS: [HIGH, MEDIUM, or LOW]"""
         "requires_escalation": requires_escalation,
         "workflow_path": ["resolution"],
         "status": "escalated_resolution" if requires_escalation else "resolved",
+        "degraded_steps": ["resolution"] if degraded else [],
     }
+
+
+def resolution_node(state: ComplaintState) -> dict:
+    """Step 4: Resolution - Propose a resolution based on all investigation findings
+
+    The response is streamed: partial text goes out on the graph's custom
+    stream (stream_mode="custom") while it is being generated.
+    """
+    emit("resolution", "started", logging.DEBUG)
+
+    findings = state.get("investigation_findings", {})
+    if not findings:
+        emit("resolution", "blocked", logging.WARNING, reason="no documented investigation results")
+        return dict(RESOLUTION_BLOCKED)
+
+    categories = list(findings.keys())
+    relay = _TokenRelay(_ResolutionParser(categories))
+    prompt, kwargs, degraded = _resolution_request(state)
+    response = call_llm(
+        "resolve",
+        [HumanMessage(content=prompt)],
+        get_llm("resolve").with_config(callbacks=[relay]),
+        **kwargs,
+    )
+    relay.finish(response.content)
+    return _resolution_update(categories, response.content, degraded)
+
+
+async def aresolution_node(state: ComplaintState) -> dict:
+    """Async twin of resolution_node, used when the graph runs via ainvoke/astream."""
+    emit("resolution", "started", logging.DEBUG)
+
+    findings = state.get("investigation_findings", {})
+    if not findings:
+        emit("resolution", "blocked", logging.WARNING, reason="no documented investigation results")
+        return dict(RESOLUTION_BLOCKED)
+
+    categories = list(findings.keys())
+    relay = _TokenRelay(_ResolutionParser(categories))
+    prompt, kwargs, degraded = _resolution_request(state)
+    response = await acall_llm(
+        "resolve",
+        [HumanMessage(content=prompt)],
+        get_llm("resolve").with_config(callbacks=[relay]),
+        **kwargs,
+    )
+    relay.finish(response.content)
+    return _resolution_update(categories, response.content, degraded)
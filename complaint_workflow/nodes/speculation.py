@@ -0,0 +1,147 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from complaint_workflow.nodes.investigation import (
+    investigate_category_node,
+    ainvestigate_category_node,
+)
+from complaint_workflow.nodes.validation import (
+    validate_category_node,
+    avalidate_category_node,
+    validation_node,
+)
+from complaint_workflow.state import ComplaintState, CategoryValidationState
+from complaint_workflow.eventlog import emit
+
+
+class SpeculationStats:
+    """Process-wide counters for speculative investigations.
+
+    Every speculated investigation ends up kept (its category was valid),
+    discarded (rejected, or validation failed, after the investigation had
+    started on a thread or had already finished) or cancelled (stopped in
+    time). The last two are wasted work.
+    """
+
+    def __init__(self):
+        self.launched = 0
+        self.kept = 0
+        self.discarded = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> dict:
+        wasted = self.discarded + self.cancelled
+        return {
+            "launched": self.launched,
+            "kept": self.kept,
+            "discarded": self.discarded,
+            "cancelled": self.cancelled,
+            "waste_rate": wasted / self.launched if self.launched else 0.0,
+        }
+
+
+speculation_stats = SpeculationStats()
+
+# Sync-mode investigations run here. The pool is shared and bounded, so
+# speculative work cannot take more than SPECULATION_WORKERS threads, and an
+# investigation still waiting for a thread can be cancelled.
+SPECULATION_WORKERS = int(os.environ.get("SPECULATION_WORKERS", "8"))
+_executor = ContextThreadPoolExecutor(max_workers=SPECULATION_WORKERS, thread_name_prefix="speculation")
+
+
+def _report_orphan(investigation: concurrent.futures.Future):
+    if not investigation.cancelled() and investigation.exception() is not None:
+        emit(
+            "speculation",
+            "discarded investigation failed",
+            logging.DEBUG,
+            error=repr(investigation.exception()),
+        )
+
+
+def _drop(investigation: concurrent.futures.Future) -> str:
+    """Stop an unwanted sync investigation if it has not started; one already
+    running finishes on the pool and is thrown away. Returns the outcome."""
+    if investigation.cancel():
+        return "cancelled"
+    investigation.add_done_callback(_report_orphan)
+    return "discarded"
+
+
+def _adrop(investigation: asyncio.Task) -> str:
+    """Async twin of _drop: a task can be cancelled even while it runs."""
+    if investigation.done():
+        investigation.exception()  # mark a failed investigation as handled
+        return "discarded"
+    investigation.cancel()
+    return "cancelled"
+
+
+def _speculation_update(category: str, validated: dict, outcome: str, investigated: dict | None) -> dict:
+    speculation_stats.record(outcome)
+    if outcome != "kept":
+        emit("speculation", "investigation dropped", category=category, outcome=outcome)
+        return validated
+    return {
+        **validated,
+        "investigation_findings": investigated["investigation_findings"],
+        "degraded_steps": investigated["degraded_steps"],
+    }
+
+
+def speculate_category_node(state: CategoryValidationState) -> dict:
+    """Validate one category while its investigation already runs on a worker
+    thread; the findings are kept only if the category is valid."""
+    category = state["category"]
+    if category == "other":
+        return validate_category_node(state)
+
+    speculation_stats.record("launched")
+    investigation = _executor.submit(investigate_category_node, state)
+    try:
+        validated = validate_category_node(state)
+    except BaseException:
+        speculation_stats.record(_drop(investigation))
+        raise
+    if validated["validation_results"][category]["status"] == "valid":
+        return _speculation_update(category, validated, "kept", investigation.result())
+    return _speculation_update(category, validated, _drop(investigation), None)
+
+
+async def aspeculate_category_node(state: CategoryValidationState) -> dict:
+    """Async twin of speculate_category_node: the investigation runs as a
+    task and is cancelled outright if the category is rejected."""
+    category = state["category"]
+    if category == "other":
+        return await avalidate_category_node(state)
+
+    speculation_stats.record("launched")
+    investigation = asyncio.create_task(ainvestigate_category_node(state))
+    try:
+        validated = await avalidate_category_node(state)
+    except BaseException:
+        speculation_stats.record(_adrop(investigation))
+        raise
+    if validated["validation_results"][category]["status"] == "valid":
+        return _speculation_update(category, validated, "kept", await investigation)
+    return _speculation_update(category, validated, _adrop(investigation), None)
+
+
+def speculation_node(state: ComplaintState) -> dict:
+    """Steps 2+3 in speculative mode: the overall validation status, plus the
+    investigations that were already finished alongside it."""
+    update = validation_node(state)
+    update["workflow_path"] += [
+        f"investigation:{category}" for category in state.get("investigation_findings", {})
+    ]
+    return update
@@ -0,0 +1,109 @@
+import logging
+from typing import Literal
+
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, Field
+
+from complaint_workflow.nodes.validation import ESCALATED_OTHER
+from complaint_workflow.state import ComplaintState
+from complaint_workflow.llm import acall_llm, call_llm, get_llm
+from complaint_workflow.eventlog import emit
+from complaint_workflow.deadline import current_deadline
+from complaint_workflow.compact import REPLY_TERSELY, compact_enabled
+
+
+class CategoryVerdict(BaseModel):
+    category: Literal["portal", "monster", "psychic", "environmental"]
+    verdict: Literal["VALID", "REJECT"]
+    reason: str = Field(description="One sentence explaining the verdict")
+
+
+class Triage(BaseModel):
+    """Categories of a complaint with a validation verdict for each."""
+
+    verdicts: list[CategoryVerdict] = Field(
+        description="One entry per matching category; empty if none match"
+    )
+
+
+def _triage_prompt(complaint: str) -> str:
+    prompt = f"""Categorize this Downside Up complaint and validate it for each category it matches. A complaint may involve MULTIPLE categories.
+
+Categories:
+- portal: Issues with portal timing, location, or behavior
+- monster: Issues with creature behavior (demogorgons, etc.)
+- psychic: Issues with psychic abilities or limitations
+- environmental: Issues with electricity, weather, or physical environment
+
+For each matching category, apply its validation rule:
+- portal: VALID only if it references a specific location or timing anomaly related to portals.
+- monster: VALID only if it describes specific creature behavior or interactions.
+- psychic: VALID only if it references specific ability limitations or malfunctions.
+- environmental: VALID only if it connects to electricity, weather, or observable physical phenomena.
+Otherwise the verdict is REJECT.
+
+Complaint: {complaint}
+
+Return one verdict per matching category. If none of the categories match, return no verdicts."""
+    if compact_enabled():
+        prompt += f"\n{REPLY_TERSELY}: keep each reason under 10 words."
+    return prompt
+
+
+def _triage_update(triage: Triage) -> dict:
+    validation_results = {}
+    for v in triage.verdicts:
+        if v.category in validation_results:
+            continue
+        if v.verdict == "VALID":
+            status, message = "valid", v.reason or "Complaint meets category-specific criteria."
+        else:
+            status, message = "rejected", v.reason or "Complaint lacks sufficient detail."
+        emit("triage", "verdict", category=v.category, verdict=v.verdict, reason=message)
+        validation_results[v.category] = {"status": status, "message": message}
+
+    if not validation_results:
+        emit("triage", "escalated", category="other")
+        validation_results = {"other": dict(ESCALATED_OTHER)}
+
+    categories = list(validation_results)
+    emit("triage", "categorized", categories=categories)
+    return {
+        "categories": categories,
+        "categorized_by": "llm",
+        "validation_results": validation_results,
+        "workflow_path": ["intake"],
+        "status": "intake",
+    }
+
+
+def _structured_llm():
+    # Tool calling rather than a JSON-schema response format: the tool call
+    # round-trips through the LLM cache as a plain message.
+    return get_llm("triage").with_structured_output(Triage, method="function_calling")
+
+
+def triage_node(state: ComplaintState) -> dict:
+    """Steps 1+2 in one call: categorize the complaint and validate each category.
+
+    Used instead of intake + validate_category when the graph is built with
+    combined triage; the 'validate' aggregator still sets the overall status.
+    """
+    emit("triage", "started", logging.DEBUG)
+
+    prompt = _triage_prompt(state["complaint"])
+    triage = call_llm(
+        "triage", [HumanMessage(content=prompt)], _structured_llm(), deadline=current_deadline(state)
+    )
+    return _triage_update(triage)
+
+
+async def atriage_node(state: ComplaintState) -> dict:
+    """Async twin of triage_node, used when the graph runs via ainvoke/astream."""
+    emit("triage", "started", logging.DEBUG)
+
+    prompt = _triage_prompt(state["complaint"])
+    triage = await acall_llm(
+        "triage", [HumanMessage(content=prompt)], _structured_llm(), deadline=current_deadline(state)
+    )
+    return _triage_update(triage)
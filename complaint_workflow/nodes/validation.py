@@ -1,27 +1,26 @@
-from langchain_core.messages import HumanMessage
+import logging
 
-from complaint_workflow.state import ComplaintState
-from complaint_workflow.llm import llm
+from complaint_workflow.state import ComplaintState, CategoryValidationState
+from complaint_workflow.batching import acomplete, complete
+from complaint_workflow.compact import compact_enabled, compact_verdict_format, split_verdict, stop_kwargs
+from complaint_workflow.eventlog import emit
+from complaint_workflow.deadline import current_deadline
 
+ESCALATED_OTHER = {
+    "status": "escalate",
+    "message": "Complaint categorized as 'other'. Escalated for manual review.",
+}
 
-def validation_node(state: ComplaintState) -> dict:
-    """Step 2: Validate - Check complaint meets criteria for each identified category"""
-    print("\n[VALIDATION] Validating complaint...")
-
-    complaint = state["complaint"]
-    categories = state["categories"]
-    validation_results: dict[str, dict] = {}
-
-    for category in categories:
-        if category == "other":
-            print(f"[VALIDATION] '{category}' -> auto-escalated for manual review")
-            validation_results[category] = {
-                "status": "escalate",
-                "message": "Complaint categorized as 'other'. Escalated for manual review.",
-            }
-            continue
 
-        validation_prompt = f"""You are validating a Downside Up complaint that was categorized as "{category}".
+def _validation_prompt(complaint: str, category: str) -> str:
+    if compact_enabled():
+        answer_format = compact_verdict_format("VALID or REJECT")
+    else:
+        answer_format = (
+            "Respond with EXACTLY one of these two words: VALID or REJECT\n"
+            "Then on a new line, provide a brief reason."
+        )
+    return f"""You are validating a Downside Up complaint that was categorized as "{category}".
 
 Apply the following validation rule for the "{category}" category:
 
@@ -33,25 +32,63 @@ Apply the following validation rule for the "{category}" category:
 Complaint: {complaint}
 
 Does this complaint contain enough specific detail to satisfy the rule above?
-Respond with EXACTLY one of these two words: VALID or REJECT
-Then on a new line, provide a brief reason."""
+{answer_format}"""
+
+
+def _parse_verdict(category: str, content: str) -> dict:
+    verdict, reason = split_verdict(content)
+
+    if verdict == "VALID":
+        status = "valid"
+        message = reason or "Complaint meets category-specific criteria."
+    else:
+        status = "rejected"
+        message = reason or "Complaint lacks sufficient detail."
+
+    emit("validation", "verdict", category=category, status=status, reason=message)
+    return {"status": status, "message": message}
 
-        response = llm.invoke([HumanMessage(content=validation_prompt)])
-        result = response.content.strip()
-        first_line = result.split("\n")[0].strip().upper()
-        reason = "\n".join(result.split("\n")[1:]).strip()
 
-        if first_line == "VALID":
-            status = "valid"
-            message = reason or "Complaint meets category-specific criteria."
-            print(f"[VALIDATION] {category}: VALID - {message}")
-        else:
-            status = "rejected"
-            message = reason or "Complaint lacks sufficient detail."
-            print(f"[VALIDATION] {category}: REJECTED - {message}")
+def validate_category_node(state: CategoryValidationState) -> dict:
+    """Validate a single category in parallel. Receives minimal state via Send."""
+    category = state["category"]
+    emit("validation", "started", logging.DEBUG, category=category)
 
-        validation_results[category] = {"status": status, "message": message}
+    if category == "other":
+        emit("validation", "escalated", category=category)
+        return {"validation_results": {category: dict(ESCALATED_OTHER)}}
+
+    prompt = _validation_prompt(state["complaint"], category)
+    content = complete(
+        "validate_category", prompt, deadline=current_deadline(state), **stop_kwargs("validate_category")
+    )
+    return {"validation_results": {category: _parse_verdict(category, content)}}
+
+
+async def avalidate_category_node(state: CategoryValidationState) -> dict:
+    """Async twin of validate_category_node, used when the graph runs via ainvoke/astream."""
+    category = state["category"]
+    emit("validation", "started", logging.DEBUG, category=category)
+
+    if category == "other":
+        emit("validation", "escalated", category=category)
+        return {"validation_results": {category: dict(ESCALATED_OTHER)}}
+
+    prompt = _validation_prompt(state["complaint"], category)
+    content = await acomplete(
+        "validate_category", prompt, deadline=current_deadline(state), **stop_kwargs("validate_category")
+    )
+    return {"validation_results": {category: _parse_verdict(category, content)}}
+
+
+def validation_node(state: ComplaintState) -> dict:
+    """Step 2: Validate - Combine the per-category verdicts into an overall status.
 
+    The verdicts come from the parallel validate_category branches and are
+    merged into validation_results by its reducer (or all at once from the
+    combined triage node).
+    """
+    validation_results = state.get("validation_results", {})
     has_valid = any(r["status"] == "valid" for r in validation_results.values())
     all_escalated = all(r["status"] == "escalate" for r in validation_results.values())
 
@@ -62,8 +99,8 @@ Then on a new line, provide a brief reason."""
     else:
         overall_status = "rejected"
 
+    emit("validation", "overall", status=overall_status)
     return {
-        "validation_results": validation_results,
         "workflow_path": ["validation"],
         "status": overall_status,
     }
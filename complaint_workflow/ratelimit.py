@@ -0,0 +1,364 @@
+"""Shared rate limiter and adaptive concurrency limit for LLM calls.
+
+Every concurrent workflow calls the same chat model, so the limiter is a
+process-wide gate attached to it as LangChain's ``rate_limiter``. LangChain
+consults it only on a cache miss, just before the request goes out. A call
+is admitted when all three of these hold:
+
+- a request-per-minute token bucket has a request left,
+- a token-per-minute bucket covers the call's estimated tokens (prompt
+  characters / 4 plus an output allowance), and
+- fewer than ``limit`` calls are in flight.
+
+``limit`` adapts AIMD-style (additive increase, multiplicative decrease).
+Every successful call raises it by 1/limit, about +1 per round of calls, up
+to ``max_concurrency``. A rate-limit error (HTTP 429) halves it. A call
+slower than ``latency_target`` cuts it by 10%. There is at most one cut per
+typical call duration (a moving average), so failures from calls that were
+all in flight together count once, as in TCP congestion control.
+
+Waiting calls are admitted by stage priority: later pipeline stages first,
+so nearly finished complaints are not starved by new intakes. Ties go to
+the earliest arrival.
+
+Calls made through ``complaint_workflow.llm.call_llm``/``acall_llm`` carry
+their node name and token estimate, hold a concurrency slot until they
+finish, and report their outcome. Any other call through the model is only
+subject to the buckets.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+# Admission order when calls are waiting: lower goes first. Keys are call_llm
+# node names; speculative investigations call as investigate_category.
+STAGE_PRIORITY = {
+    "close": 0,
+    "resolve": 1,
+    "investigate_category": 2,
+    "validate_category": 3,
+    "triage": 4,
+    "intake": 4,
+}
+DEFAULT_PRIORITY = 5
+
+# Queue-time histogram buckets in seconds.
+QUEUE_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The buckets hold this many seconds' worth of their per-minute budget, so a
+# burst cannot spend a whole minute's allowance at once.
+BURST_SECONDS = 10
+
+
+@dataclass
+class Ticket:
+    """One LLM call as seen by the limiter."""
+
+    node: str = ""
+    tokens: int = 0
+    priority: int = DEFAULT_PRIORITY
+    holds_slot: bool = False
+    granted_at: Optional[float] = None
+
+
+# Set by call_llm around each call; read by acquire() to find the call's
+# node and token estimate.
+current_ticket: ContextVar[Optional[Ticket]] = ContextVar("llm_ticket", default=None)
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """True for HTTP 429 errors (openai.RateLimitError and look-alikes)."""
+    return getattr(exc, "status_code", None) == 429 or type(exc).__name__ == "RateLimitError"
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, per_minute * BURST_SECONDS / 60)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0 if it already is)."""
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    ticket: Ticket = field(compare=False)
+    enqueued: float = field(compare=False)
+    event: Optional[threading.Event] = field(default=None, compare=False)
+    loop: Optional[asyncio.AbstractEventLoop] = field(default=None, compare=False)
+    future: Optional[asyncio.Future] = field(default=None, compare=False)
+    granted: bool = field(default=False, compare=False)
+    abandoned: bool = field(default=False, compare=False)
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        elif self.loop is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveLimiter(BaseRateLimiter):
+    """Token buckets plus an AIMD concurrency limit, with priority admission."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 32,
+        min_concurrency: int = 1,
+        latency_target: float = 0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target = latency_target
+        self.typical_latency = 0.0
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self._requests = _Bucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self._waiting: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        # Stats.
+        self.granted = 0
+        self.rate_limited = 0
+        self.slow = 0
+        self._queue_time: dict[str, list] = {}  # node -> [bucket counts, sum, count, max]
+
+    @classmethod
+    def from_env(cls) -> Optional["AdaptiveLimiter"]:
+        """Build from LLM_LIMIT_* settings, or None if LLM_LIMIT=0."""
+        if os.environ.get("LLM_LIMIT", "1") == "0":
+            return None
+        return cls(
+            requests_per_minute=float(os.environ.get("LLM_LIMIT_RPM", "0")),
+            tokens_per_minute=float(os.environ.get("LLM_LIMIT_TPM", "0")),
+            max_concurrency=int(os.environ.get("LLM_LIMIT_MAX_CONCURRENCY", "32")),
+            min_concurrency=int(os.environ.get("LLM_LIMIT_MIN_CONCURRENCY", "1")),
+            latency_target=float(os.environ.get("LLM_LIMIT_LATENCY_TARGET", "0")),
+        )
+
+    # --- admission ---
+
+    def _admit(self) -> Optional[float]:
+        """Grant waiting calls in priority order while capacity allows.
+
+        Must hold the lock. Returns how long until the bucket blocking the
+        head of the queue has refilled, or None if nothing is blocked on a
+        bucket (waiters are then woken by release()).
+        """
+        now = time.monotonic()
+        for bucket in (self._requests, self._tokens):
+            if bucket is not None:
+                bucket.refill(now)
+        while self._waiting:
+            head = self._waiting[0]
+            if head.abandoned:
+                heapq.heappop(self._waiting)
+                continue
+            if head.ticket.holds_slot and self.in_flight >= int(self.limit):
+                return None
+            wait = max(
+                self._requests.wait_for(1) if self._requests else 0.0,
+                self._tokens.wait_for(head.ticket.tokens) if self._tokens else 0.0,
+            )
+            if wait > 0:
+                return wait
+            heapq.heappop(self._waiting)
+            if self._requests:
+                self._requests.level -= 1
+            if self._tokens:
+                self._tokens.level -= min(head.ticket.tokens, self._tokens.capacity)
+            if head.ticket.holds_slot:
+                self.in_flight += 1
+            head.granted = True
+            head.ticket.granted_at = now
+            self.granted += 1
+            self._observe_queue_time(head.ticket.node, now - head.enqueued)
+            head.wake()
+        return None
+
+    def _enqueue(self, waiter_kwargs: dict) -> _Waiter:
+        ticket = current_ticket.get() or Ticket()
+        waiter = _Waiter(
+            priority=ticket.priority,
+            seq=next(self._seq),
+            ticket=ticket,
+            enqueued=time.monotonic(),
+            **waiter_kwargs,
+        )
+        heapq.heappush(self._waiting, waiter)
+        return waiter
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        with self._lock:
+            waiter = self._enqueue({"event": threading.Event()})
+            retry = self._admit()
+        if not blocking and not waiter.granted:
+            with self._lock:
+                if not waiter.granted:
+                    waiter.abandoned = True
+                    return False
+            return True
+        while not waiter.granted:
+            waiter.event.wait(retry)
+            with self._lock:
+                retry = self._admit()
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._enqueue({"loop": loop, "future": loop.create_future()})
+            retry = self._admit()
+        if not blocking and not waiter.granted:
+            with self._lock:
+                if not waiter.granted:
+                    waiter.abandoned = True
+                    return False
+            return True
+        try:
+            while not waiter.granted:
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), retry)
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    retry = self._admit()
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._free_slot(waiter.ticket)
+                else:
+                    waiter.abandoned = True
+            raise
+        return True
+
+    # --- completion ---
+
+    def _free_slot(self, ticket: Ticket):
+        if ticket.holds_slot and ticket.granted_at is not None:
+            self.in_flight -= 1
+            ticket.granted_at = None
+            self._admit()
+
+    def release(self, ticket: Ticket, error: Optional[BaseException] = None, used_tokens: Optional[int] = None):
+        """Report that a call admitted with ``ticket`` finished.
+
+        Adjusts the concurrency limit from its outcome and returns any
+        over-estimated tokens to the token bucket. No-op for calls that
+        were never admitted (cache hits).
+        """
+        with self._lock:
+            if ticket.granted_at is None:
+                return
+            now = time.monotonic()
+            latency = now - ticket.granted_at
+            self.typical_latency = latency if not self.typical_latency else (
+                0.8 * self.typical_latency + 0.2 * latency
+            )
+            if error is not None and is_rate_limit_error(error):
+                self.rate_limited += 1
+                self._decrease(now, 0.5)
+            elif self.latency_target and latency > self.latency_target:
+                self.slow += 1
+                self._decrease(now, 0.9)
+            elif error is None:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            if self._tokens is not None and used_tokens is not None:
+                self._tokens.level = min(
+                    self._tokens.capacity, self._tokens.level + ticket.tokens - used_tokens
+                )
+            self._free_slot(ticket)
+
+    def _decrease(self, now: float, factor: float):
+        if now - self._last_decrease < self.typical_latency:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit * factor)
+
+    # --- stats ---
+
+    def _observe_queue_time(self, node: str, seconds: float):
+        hist = self._queue_time.setdefault(node or "other", [[0] * len(QUEUE_BUCKETS), 0.0, 0, 0.0])
+        index = bisect.bisect_left(QUEUE_BUCKETS, seconds)
+        if index < len(QUEUE_BUCKETS):
+            hist[0][index] += 1
+        hist[1] += seconds
+        hist[2] += 1
+        hist[3] = max(hist[3], seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": sum(1 for w in self._waiting if not w.abandoned),
+                "granted": self.granted,
+                "rate_limited": self.rate_limited,
+                "slow": self.slow,
+                "queue_seconds": {
+                    node: {"count": count, "mean": total / count if count else 0.0, "max": peak}
+                    for node, (_, total, count, peak) in sorted(self._queue_time.items())
+                },
+            }
+
+    def render(self) -> str:
+        """Limiter metrics in the Prometheus text exposition format."""
+        with self._lock:
+            queue_time = {k: (list(v[0]), v[1], v[2]) for k, v in self._queue_time.items()}
+            gauges = (self.limit, self.in_flight, sum(1 for w in self._waiting if not w.abandoned))
+            rate_limited = self.rate_limited
+
+        lines = [
+            "# HELP complaint_llm_queue_seconds Time an LLM call waited for the rate limiter.",
+            "# TYPE complaint_llm_queue_seconds histogram",
+        ]
+        for node, (counts, total, count) in sorted(queue_time.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(QUEUE_BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'complaint_llm_queue_seconds_bucket{{node="{node}",le="{bound}"}} {cumulative}')
+            lines.append(f'complaint_llm_queue_seconds_bucket{{node="{node}",le="+Inf"}} {count}')
+            lines.append(f'complaint_llm_queue_seconds_sum{{node="{node}"}} {total}')
+            lines.append(f'complaint_llm_queue_seconds_count{{node="{node}"}} {count}')
+        for name, help_text, value in zip(
+            ("complaint_llm_concurrency_limit", "complaint_llm_in_flight", "complaint_llm_waiting"),
+            ("Current adaptive concurrency limit.", "LLM calls in flight.", "LLM calls waiting to be admitted."),
+            gauges,
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        lines += [
+            "# HELP complaint_llm_rate_limited_total LLM calls rejected with HTTP 429.",
+            "# TYPE complaint_llm_rate_limited_total counter",
+            f"complaint_llm_rate_limited_total {rate_limited}",
+        ]
+        return "\n".join(lines) + "\n"
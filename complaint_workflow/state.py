@@ -1,8 +1,10 @@
 import operator
-from typing import Annotated, TypedDict, List
+from typing import Annotated, TypedDict, List, Optional
 
 from langchain_core.documents import Document
 
+from complaint_workflow.deadline import new_deadline
+
 
 def merge_dicts(a: dict, b: dict) -> dict:
     return {**a, **b}
@@ -12,10 +14,11 @@ class ComplaintState(TypedDict):
     complaint: str
     context: List[Document]
     categories: list[str]
+    categorized_by: str  # "llm", or "model"/"rules+model" for the local classifier
     resolution: str
     workflow_path: Annotated[list[str], operator.add]
     status: str
-    validation_results: dict  # {category: {status, message}}
+    validation_results: Annotated[dict, merge_dicts]  # {category: {status, message}}
     investigation_findings: Annotated[dict, merge_dicts]  # {category: findings}
     effectiveness_rating: str
     requires_escalation: bool
@@ -23,9 +26,48 @@ class ComplaintState(TypedDict):
     satisfaction_verified: bool
     follow_up_required: bool
     closed_at: str
+    node_metrics: Annotated[list[dict], operator.add]  # one entry per node run, see metrics.py
+    deadline: float  # time.time() by which to finish, 0 for none; see deadline.py
+    degraded_steps: Annotated[list[str], operator.add]  # steps cut short by the deadline
+
+
+class CategoryValidationState(TypedDict):
+    """Minimal state sent to each parallel validation via Send."""
+    complaint: str
+    category: str
+    deadline: float
 
 
 class CategoryInvestigationState(TypedDict):
     """Minimal state sent to each parallel investigation via Send."""
     complaint: str
     category: str
+    deadline: float
+
+
+def new_complaint_state(text: str, budget: Optional[float] = None) -> ComplaintState:
+    """Build the initial state for a freshly submitted complaint.
+
+    ``budget`` is its deadline in seconds from now (default: the
+    COMPLAINT_DEADLINE env var, 0 for none).
+    """
+    return {
+        "complaint": text,
+        "context": [],
+        "categories": [],
+        "categorized_by": "",
+        "resolution": "",
+        "workflow_path": [],
+        "status": "new",
+        "validation_results": {},
+        "investigation_findings": {},
+        "effectiveness_rating": "",
+        "requires_escalation": False,
+        "closure_log": "",
+        "satisfaction_verified": False,
+        "follow_up_required": False,
+        "closed_at": "",
+        "node_metrics": [],
+        "deadline": new_deadline(budget),
+        "degraded_steps": [],
+    }
@@ -1,10 +1,26 @@
 from __future__ import annotations
 
+import base64
 import json
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import Column, String, Text, create_engine
+from sqlalchemy import (
+    Column,
+    Float,
+    Index,
+    Integer,
+    String,
+    Text,
+    and_,
+    create_engine,
+    func,
+    insert,
+    inspect,
+    or_,
+    select,
+)
+from sqlalchemy import text as sql_text
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 DATABASE_URL = "sqlite:///complaints.db"
@@ -26,27 +42,127 @@ class Complaint(Base):
     closure_log = Column(Text, default="")
     state_json = Column(Text, default="{}")
     error = Column(Text, default="")
+    duplicate_of = Column(String, default="")
+    # Lease held by the worker currently processing the row (see claim_complaint).
+    worker_id = Column(String, default="")
+    lease_expires_at = Column(String, default="")
     created_at = Column(String, nullable=False)
     updated_at = Column(String, nullable=False)
+    # Bumped by every insert and update, see _next_change_seq.
+    change_seq = Column(Integer)
+
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) newest first, optionally
+        # within one status; claiming filters on status.
+        Index("ix_complaints_created_at_id", "created_at", "id"),
+        Index("ix_complaints_status_created_at", "status", "created_at"),
+        # Sweeps of finished complaints filter on updated_at.
+        Index("ix_complaints_updated_at_id", "updated_at", "id"),
+        # Change feed walks change_seq forward; the ETag reads its maximum.
+        Index("ix_complaints_change_seq", "change_seq", unique=True),
+    )
+
+
+class NodeMetric(Base):
+    """One workflow node run of a complaint (see complaint_workflow.metrics)."""
+
+    __tablename__ = "node_metrics"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    complaint_id = Column(String, nullable=False, index=True)
+    node = Column(String, nullable=False)
+    category = Column(String, default="")
+    seconds = Column(Float, nullable=False)
+    input_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+    created_at = Column(String, nullable=False)
+
+    __table_args__ = (Index("ix_node_metrics_created_at", "created_at"),)
+
+
+# Columns returned by list_complaints; the heavy ones (state_json, findings,
+# resolution, closure_log) are only loaded by get_complaint.
+LIST_COLUMNS = (
+    Complaint.id,
+    Complaint.complaint,
+    Complaint.status,
+    Complaint.categories,
+    Complaint.duplicate_of,
+    Complaint.created_at,
+    Complaint.updated_at,
+)
 
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    with engine.begin() as conn:
+        # Rows written before change_seq existed.
+        conn.execute(sql_text("UPDATE complaints SET change_seq = rowid WHERE change_seq IS NULL"))
+    # Like columns, indexes are only created with the table by create_all().
+    for index in Complaint.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+def _add_missing_columns():
+    """create_all() never alters an existing table, so add any columns that
+    were introduced after the database file was first created."""
+    existing = {c["name"] for c in inspect(engine).get_columns(Complaint.__tablename__)}
+    with engine.begin() as conn:
+        for column in Complaint.__table__.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(engine.dialect)
+                conn.execute(sql_text(
+                    f"ALTER TABLE {Complaint.__tablename__} ADD COLUMN {column.name} {column_type}"
+                ))
 
 
 def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def create_complaint(text: str) -> dict:
+def _next_change_seq():
+    """SQL for the next change_seq, for the insert or update that sets it.
+
+    It is evaluated inside that statement, under SQLite's write lock, which
+    is held until commit; so changes commit in change_seq order, which is
+    not true of updated_at (stamped in Python before the lock is taken).
+    """
+    return select(func.coalesce(func.max(Complaint.change_seq), 0) + 1).scalar_subquery()
+
+
+def _lease_expiry(lease_seconds: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)).isoformat()
+
+
+def _claimable(now: str, worker_id: str | None = None):
+    """Rows a worker may claim: never started, or processing under a lease that
+    has expired (its worker died or stalled). A worker may always re-claim its
+    own row."""
+    stale = or_(
+        Complaint.lease_expires_at < now,
+        Complaint.lease_expires_at == "",
+        Complaint.lease_expires_at.is_(None),
+    )
+    if worker_id is not None:
+        stale = or_(stale, Complaint.worker_id == worker_id)
+    return or_(
+        Complaint.status == "submitted",
+        and_(Complaint.status == "processing", stale),
+    )
+
+
+def create_complaint(text: str, duplicate_of: str = "") -> dict:
     db = SessionLocal()
     try:
         complaint = Complaint(
             id=str(uuid.uuid4()),
             complaint=text,
             status="submitted",
+            duplicate_of=duplicate_of,
             created_at=_now(),
             updated_at=_now(),
+            change_seq=_next_change_seq(),
         )
         db.add(complaint)
         db.commit()
@@ -56,6 +172,43 @@ def create_complaint(text: str) -> dict:
         db.close()
 
 
+def create_complaints(texts: list[str], duplicate_of: list[str] | None = None) -> list[dict]:
+    """Insert many complaints in a single transaction (one executemany, one commit).
+
+    The executemany runs the insert once per row, so each gets its own
+    change_seq.
+    """
+    duplicate_of = duplicate_of or [""] * len(texts)
+    now = _now()
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "complaint": text,
+            "status": "submitted",
+            "categories": "[]",
+            "findings": "{}",
+            "resolution": "",
+            "closure_log": "",
+            "state_json": "{}",
+            "error": "",
+            "duplicate_of": dup,
+            "worker_id": "",
+            "lease_expires_at": "",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for text, dup in zip(texts, duplicate_of)
+    ]
+    db = SessionLocal()
+    try:
+        if rows:
+            db.execute(insert(Complaint).values(change_seq=_next_change_seq()), rows)
+            db.commit()
+        return [{"id": r["id"], "status": r["status"]} for r in rows]
+    finally:
+        db.close()
+
+
 def get_complaint(complaint_id: str) -> dict | None:
     db = SessionLocal()
     try:
@@ -67,33 +220,297 @@ def get_complaint(complaint_id: str) -> dict | None:
         db.close()
 
 
-def list_complaints() -> list[dict]:
+def _encode_cursor(created_at: str, complaint_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at}|{complaint_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverse of _encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        created_at, complaint_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    return created_at, complaint_id
+
+
+def list_complaints(
+    limit: int = 50,
+    cursor: str | None = None,
+    status: str | None = None,
+    category: str | None = None,
+) -> dict:
+    """One page of complaints, newest first, as lightweight list rows.
+
+    Pages are keyset-paginated on (created_at, id): pass the returned
+    next_cursor to get the following page. next_cursor is None on the last
+    page. Raises ValueError for a malformed cursor.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(*LIST_COLUMNS)
+        if status:
+            query = query.filter(Complaint.status == status)
+        if category:
+            # categories is a JSON list of plain category names.
+            query = query.filter(Complaint.categories.like(f'%"{category}"%'))
+        if cursor:
+            created_at, complaint_id = _decode_cursor(cursor)
+            query = query.filter(
+                or_(
+                    Complaint.created_at < created_at,
+                    and_(Complaint.created_at == created_at, Complaint.id < complaint_id),
+                )
+            )
+        rows = (
+            query.order_by(Complaint.created_at.desc(), Complaint.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
+        return {"items": [_list_row_to_dict(r) for r in rows], "next_cursor": next_cursor}
+    finally:
+        db.close()
+
+
+def _encode_change_cursor(change_seq: int) -> str:
+    return base64.urlsafe_b64encode(f"seq:{change_seq}".encode()).decode()
+
+
+def _decode_change_cursor(cursor: str) -> int:
+    """Inverse of _encode_change_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        prefix, change_seq = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+        if prefix != "seq":
+            raise ValueError(prefix)
+        return int(change_seq)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+
+
+def list_changes(since: str | None = None, limit: int = 200) -> dict:
+    """Complaints created or updated after the ``since`` cursor, oldest change
+    first, as lightweight list rows.
+
+    The returned cursor points at the last change included; pass it as
+    ``since`` next time. Without ``since`` no rows are returned, only the
+    cursor of the latest change, for a client to start following from.
+    has_more is True when the page was cut at ``limit``. Raises ValueError
+    for a malformed cursor.
+
+    Changes are ordered by change_seq, which commits in order, so a change
+    that commits after a client read its cursor is never skipped.
+    """
     db = SessionLocal()
     try:
-        rows = db.query(Complaint).order_by(Complaint.created_at.desc()).all()
-        return [_row_to_dict(r) for r in rows]
+        if not since:
+            head = db.query(func.max(Complaint.change_seq)).scalar()
+            return {"items": [], "cursor": _encode_change_cursor(head or 0), "has_more": False}
+
+        after = _decode_change_cursor(since)
+        rows = (
+            db.query(*LIST_COLUMNS, Complaint.change_seq)
+            .filter(Complaint.change_seq > after)
+            .order_by(Complaint.change_seq)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        cursor = _encode_change_cursor(rows[-1].change_seq) if rows else since
+        return {
+            "items": [_list_row_to_dict(r) for r in rows],
+            "cursor": cursor,
+            "has_more": has_more,
+        }
     finally:
         db.close()
 
 
-def mark_processing(complaint_id: str):
+def complaints_fingerprint() -> str:
+    """Changes whenever any complaint is inserted or updated; used as an ETag.
+
+    Every write bumps change_seq, so its maximum (one lookup in
+    ix_complaints_change_seq) is enough.
+    """
     db = SessionLocal()
     try:
-        row = db.query(Complaint).filter(Complaint.id == complaint_id).first()
-        if row:
-            row.status = "processing"
-            row.updated_at = _now()
-            db.commit()
+        return str(db.query(func.max(Complaint.change_seq)).scalar() or 0)
     finally:
         db.close()
 
 
-def save_workflow_result(complaint_id: str, state: dict):
+def get_complaint_status(complaint_id: str) -> str | None:
     db = SessionLocal()
     try:
-        row = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+        row = db.query(Complaint.status).filter(Complaint.id == complaint_id).first()
+        return row.status if row else None
+    finally:
+        db.close()
+
+
+def list_indexable_complaints(since: int = 0) -> list[tuple[str, str, int]]:
+    """(id, text, change_seq) of closed complaints that were processed in full,
+    i.e. the ones a near-duplicate may reuse results from, changed after the
+    ``since`` change_seq."""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Complaint.id, Complaint.complaint, Complaint.change_seq)
+            .filter(Complaint.status == "closed")
+            .filter((Complaint.duplicate_of == "") | (Complaint.duplicate_of.is_(None)))
+            .filter(Complaint.change_seq > since)
+            .all()
+        )
+        return [(r.id, r.complaint, r.change_seq) for r in rows]
+    finally:
+        db.close()
+
+
+def list_llm_categorized_complaints() -> list[tuple[str, list[str]]]:
+    """(text, categories) of closed, fully processed complaints whose intake
+    categories came from the LLM, as training data for the intake classifier.
+
+    Rows categorized by the classifier itself are left out so it never
+    learns from its own guesses.
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Complaint.complaint, Complaint.categories, Complaint.state_json)
+            .filter(Complaint.status == "closed")
+            .filter((Complaint.duplicate_of == "") | (Complaint.duplicate_of.is_(None)))
+            .all()
+        )
+        examples = []
+        for r in rows:
+            state = json.loads(r.state_json or "{}")
+            if state.get("categorized_by", "llm") == "llm":
+                examples.append((r.complaint, json.loads(r.categories or "[]")))
+        return examples
+    finally:
+        db.close()
+
+
+def list_claimable_complaints(limit: int) -> list[dict]:
+    """Oldest complaints that are waiting for a worker or whose lease expired."""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Complaint.id, Complaint.complaint, Complaint.duplicate_of)
+            .filter(_claimable(_now()))
+            .order_by(Complaint.created_at)
+            .limit(limit)
+            .all()
+        )
+        return [
+            {"id": r.id, "complaint": r.complaint, "duplicate_of": r.duplicate_of or ""}
+            for r in rows
+        ]
+    finally:
+        db.close()
+
+
+def list_finished_ids(before: str) -> list[str]:
+    """Ids of complaints that reached 'closed' or 'error' before the given time."""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Complaint.id)
+            .filter(Complaint.status.in_(("closed", "error")))
+            .filter(Complaint.updated_at < before)
+            .all()
+        )
+        return [r.id for r in rows]
+    finally:
+        db.close()
+
+
+def claim_complaint(complaint_id: str, worker_id: str, lease_seconds: float) -> bool:
+    """Atomically mark a complaint 'processing' under a lease held by worker_id.
+
+    The status check and the update happen in one UPDATE statement, so when
+    several workers race for the same row exactly one of them gets it.
+    Returns False if another worker holds a live lease or the row is done.
+    """
+    db = SessionLocal()
+    try:
+        now = _now()
+        claimed = (
+            db.query(Complaint)
+            .filter(Complaint.id == complaint_id, _claimable(now, worker_id))
+            .update(
+                {
+                    Complaint.status: "processing",
+                    Complaint.worker_id: worker_id,
+                    Complaint.lease_expires_at: _lease_expiry(lease_seconds),
+                    Complaint.updated_at: now,
+                    Complaint.change_seq: _next_change_seq(),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return claimed == 1
+    finally:
+        db.close()
+
+
+def claim_complaints(worker_id: str, limit: int, lease_seconds: float) -> list[dict]:
+    """Claim up to ``limit`` of the oldest claimable complaints for worker_id."""
+    claimed = []
+    # Over-fetch a little: candidates can be taken by other workers between
+    # the read and the conditional update.
+    for row in list_claimable_complaints(limit * 2):
+        if len(claimed) == limit:
+            break
+        if claim_complaint(row["id"], worker_id, lease_seconds):
+            claimed.append(row)
+    return claimed
+
+
+def renew_lease(complaint_id: str, worker_id: str, lease_seconds: float) -> bool:
+    """Heartbeat: extend worker_id's lease. False if the lease was lost."""
+    db = SessionLocal()
+    try:
+        renewed = (
+            db.query(Complaint)
+            .filter(
+                Complaint.id == complaint_id,
+                Complaint.status == "processing",
+                Complaint.worker_id == worker_id,
+            )
+            .update(
+                {Complaint.lease_expires_at: _lease_expiry(lease_seconds)},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return renewed == 1
+    finally:
+        db.close()
+
+
+def _owned_row(db, complaint_id: str, worker_id: str | None):
+    query = db.query(Complaint).filter(Complaint.id == complaint_id)
+    if worker_id is not None:
+        query = query.filter(Complaint.worker_id == worker_id)
+    return query.first()
+
+
+def save_workflow_result(complaint_id: str, state: dict, worker_id: str | None = None) -> bool:
+    """Store the final state and close the complaint.
+
+    With a worker_id, only writes if that worker still owns the row, so a
+    worker whose lease was taken over cannot clobber the new owner's result.
+    """
+    db = SessionLocal()
+    try:
+        row = _owned_row(db, complaint_id, worker_id)
         if not row:
-            return
+            return False
         row.status = "closed"
         row.categories = json.dumps(state.get("categories", []))
         row.findings = json.dumps(state.get("investigation_findings", {}))
@@ -102,25 +519,84 @@ def save_workflow_result(complaint_id: str, state: dict):
         # Serialize the full state — skip non-serializable Document objects
         serializable = {k: v for k, v in state.items() if k != "context"}
         row.state_json = json.dumps(serializable, default=str)
+        row.error = ""
+        row.lease_expires_at = ""
         row.updated_at = _now()
+        row.change_seq = _next_change_seq()
+        _replace_node_metrics(db, complaint_id, state.get("node_metrics", []), row.updated_at)
         db.commit()
+        return True
     finally:
         db.close()
 
 
-def mark_error(complaint_id: str, error_msg: str):
+def _replace_node_metrics(db, complaint_id: str, entries: list[dict], created_at: str):
+    db.query(NodeMetric).filter(NodeMetric.complaint_id == complaint_id).delete()
+    if entries:
+        db.execute(insert(NodeMetric), [
+            {
+                "complaint_id": complaint_id,
+                "node": e["node"],
+                "category": e.get("category", ""),
+                "seconds": e["seconds"],
+                "input_tokens": e.get("input_tokens", 0),
+                "output_tokens": e.get("output_tokens", 0),
+                "created_at": created_at,
+            }
+            for e in entries
+        ])
+
+
+def list_node_metrics(since: str = "", limit: int = 10_000) -> list[dict]:
+    """The newest ``limit`` stored node runs of complaints closed after
+    ``since`` (ISO timestamp)."""
     db = SessionLocal()
     try:
-        row = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+        rows = (
+            db.query(
+                NodeMetric.node,
+                NodeMetric.category,
+                NodeMetric.seconds,
+                NodeMetric.input_tokens,
+                NodeMetric.output_tokens,
+            )
+            .filter(NodeMetric.created_at > since)
+            .order_by(NodeMetric.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+        return [dict(r._mapping) for r in rows]
+    finally:
+        db.close()
+
+
+def mark_error(complaint_id: str, error_msg: str, worker_id: str | None = None):
+    db = SessionLocal()
+    try:
+        row = _owned_row(db, complaint_id, worker_id)
         if row:
             row.status = "error"
             row.error = error_msg
+            row.lease_expires_at = ""
             row.updated_at = _now()
+            row.change_seq = _next_change_seq()
             db.commit()
     finally:
         db.close()
 
 
+def _list_row_to_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "complaint": row.complaint,
+        "status": row.status,
+        "categories": json.loads(row.categories or "[]"),
+        "duplicate_of": row.duplicate_of or "",
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+    }
+
+
 def _row_to_dict(row: Complaint) -> dict:
     return {
         "id": row.id,
@@ -132,6 +608,7 @@ def _row_to_dict(row: Complaint) -> dict:
         "closure_log": row.closure_log or "",
         "state_json": json.loads(row.state_json or "{}"),
         "error": row.error or "",
+        "duplicate_of": row.duplicate_of or "",
         "created_at": row.created_at,
         "updated_at": row.updated_at,
     }
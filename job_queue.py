@@ -0,0 +1,114 @@
+"""Bounded in-process job queue with a fixed pool of async workers.
+
+The server pushes every complaint through a JobQueue instead of launching
+it straight away, so at most ``workers`` workflows run concurrently and a
+burst of submissions queues up (or is turned away once ``max_depth`` jobs
+are waiting) rather than hitting OpenAI all at once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger("job_queue")
+
+
+class QueueClosed(Exception):
+    """Raised when submitting to a queue that is draining for shutdown."""
+
+
+class JobQueue:
+    def __init__(self, workers: int = 8, max_depth: int = 100):
+        self.workers = workers
+        self.max_depth = max_depth
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._pending: OrderedDict[str, tuple[Callable[..., Awaitable[Any]], tuple]] = OrderedDict()
+        self._running: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+        self._closing = False
+        # Exponentially weighted mean job duration, used for Retry-After.
+        self._avg_duration = 10.0
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return len(self._pending)
+
+    def is_full(self) -> bool:
+        """True once max_depth jobs are waiting.
+
+        Callers check this before doing any work for a new job; submissions
+        racing past the check can overshoot max_depth by the few requests
+        in flight at that moment.
+        """
+        return self.depth >= self.max_depth
+
+    @property
+    def closing(self) -> bool:
+        return self._closing
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, for a Retry-After header."""
+        return max(1, math.ceil(self._avg_duration * (self.depth + 1) / self.workers))
+
+    def position(self, job_id: str) -> int | None:
+        """1-based position among waiting jobs, 0 if running, None if unknown."""
+        if job_id in self._running:
+            return 0
+        for index, pending_id in enumerate(self._pending, start=1):
+            if pending_id == job_id:
+                return index
+        return None
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    def submit(self, job_id: str, func: Callable[..., Awaitable[Any]], *args) -> int:
+        """Queue ``func(*args)`` under ``job_id`` and return its queue position."""
+        if self._closing:
+            raise QueueClosed()
+        if job_id in self._pending or job_id in self._running:
+            return self.position(job_id)
+        self._pending[job_id] = (func, args)
+        self._queue.put_nowait(job_id)
+        return self.depth
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            func, args = self._pending.pop(job_id)
+            self._running.add(job_id)
+            started = time.monotonic()
+            try:
+                await func(*args)
+            except Exception:
+                logger.exception("Worker %d: job %s failed", index, job_id)
+            finally:
+                self._running.discard(job_id)
+                elapsed = time.monotonic() - started
+                self._avg_duration = 0.9 * self._avg_duration + 0.1 * elapsed
+                self._queue.task_done()
+
+    async def drain(self, timeout: float):
+        """Stop accepting jobs, wait up to ``timeout`` for queued and running
+        jobs to finish, then cancel the workers.
+
+        Anything still unfinished stays 'submitted'/'processing' in the
+        database and is picked up again on the next startup.
+        """
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Shutdown drain timed out with %d queued and %d running jobs",
+                self.depth, len(self._running),
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
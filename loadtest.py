@@ -0,0 +1,355 @@
+"""HTTP load test for the complaint API.
+
+Runs two phases against a server (by default, one started in this process
+on a fresh database with the offline fake LLM; see benchmark.py):
+
+    arrivals   open-loop submissions at each --rates level for --duration
+               seconds. Records POST latency, submit->closed latency (via
+               the complaint's SSE stream), rejections (429/503), and the
+               latency of list/detail requests made while under load.
+    table      list and detail latency as the table grows through
+               --table-sizes rows. Only for the local server, which is
+               prefilled with closed complaints.
+
+    python loadtest.py --rates 2,5,10 --duration 20 --json run.json
+    python loadtest.py --rates 2,5,10 --baseline run.json
+
+Against a deployed server, pass --url; the table phase then measures the
+table as it is. --baseline compares p95 latencies with an earlier --json
+report, and the exit status is 1 if any got worse by more than
+--threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from benchmark import (
+    complaint_texts,
+    configure_environment,
+    free_port,
+    quiet_server_logs,
+    start_server,
+    wait_closed,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", help="server to test; default starts a local one with the fake LLM")
+    parser.add_argument("--rates", default="1,2,5", help="comma-separated arrival rates (complaints/s)")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per arrival rate")
+    parser.add_argument("--arrival", default="poisson", choices=("poisson", "uniform"))
+    parser.add_argument("--drain-timeout", type=float, default=60, help="max wait for in-flight complaints")
+    parser.add_argument("--probe-interval", type=float, default=0.5, help="list/detail probe period under load (s)")
+    parser.add_argument("--table-sizes", default="1000,10000,50000", help="rows to prefill for the table phase")
+    parser.add_argument("--table-requests", type=int, default=100, help="requests per endpoint per table size")
+    parser.add_argument("--skip", choices=("arrivals", "table"), help="skip one phase")
+    parser.add_argument("--seed", type=int, default=0)
+    # Local server only.
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument(
+        "--distribution", default="constant", choices=("constant", "normal", "lognormal")
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--token-latency", type=float, default=0.0, help="fake LLM seconds per output token"
+    )
+    parser.add_argument("--queue-depth", type=int, default=100, help="QUEUE_MAX_DEPTH for the local server")
+    parser.add_argument("--results", default="results.json", help="canned answers")
+    parser.add_argument("--workdir", help="defaults to a new temporary directory")
+    # Report.
+    parser.add_argument("--json", help="write the report rows to this file")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 regression (0.2 = 20%%)")
+    args = parser.parse_args()
+    args.rates = [float(r) for r in args.rates.split(",")]
+    args.table_sizes = [int(n) for n in args.table_sizes.split(",")]
+    for name in ("json", "baseline", "results"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    return args
+
+
+def summarize(phase: str, operation: str, level: str, latencies: list[float], elapsed: float, **counts) -> dict:
+    from complaint_workflow.metrics import percentiles
+
+    return {
+        "phase": phase,
+        "operation": operation,
+        "level": level,
+        "ok": len(latencies),
+        **counts,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        **percentiles(latencies),
+        "max": max(latencies, default=None),
+    }
+
+
+async def timed_get(client, path: str, samples: list[float], **params):
+    started = time.perf_counter()
+    response = await client.get(path, params=params)
+    response.raise_for_status()
+    samples.append(time.perf_counter() - started)
+    return response.json()
+
+
+# --- arrivals ---
+
+async def submit_and_follow(client, text: str, results: dict):
+    started = time.perf_counter()
+    response = await client.post("/api/complaints", json={"complaint": text})
+    results["submit"].append(time.perf_counter() - started)
+    if response.status_code in (429, 503):
+        results["rejected"] += 1
+        return
+    response.raise_for_status()
+    complaint_id = response.json()["id"]
+    results["ids"].append(complaint_id)
+    try:
+        await wait_closed(client, complaint_id)
+    except RuntimeError:
+        results["failed"] += 1
+        return
+    results["closed"].append(time.perf_counter() - started)
+
+
+async def probe(client, ids: list[str], samples: dict, interval: float, stop: asyncio.Event):
+    """List the first page and fetch a recent complaint every ``interval`` s."""
+    while not stop.is_set():
+        await timed_get(client, "/api/complaints", samples["list"], limit=50)
+        if ids:
+            await timed_get(client, f"/api/complaints/{random.choice(ids)}", samples["detail"])
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_arrivals(client, args, texts) -> list[dict]:
+    rows = []
+    for rate in args.rates:
+        results = {"submit": [], "closed": [], "ids": [], "rejected": 0, "failed": 0}
+        samples = {"list": [], "detail": []}
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, results["ids"], samples, args.probe_interval, stop))
+
+        tasks = []
+        started = time.perf_counter()
+        next_arrival = started
+        while next_arrival < started + args.duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+            text = texts[len(tasks) % len(texts)]
+            tasks.append(asyncio.create_task(submit_and_follow(client, text, results)))
+            gap = random.expovariate(rate) if args.arrival == "poisson" else 1 / rate
+            next_arrival += gap
+        submitted = time.perf_counter() - started
+
+        done, pending = await asyncio.wait(tasks, timeout=args.drain_timeout)
+        for task in pending:
+            task.cancel()
+        errors = sum(1 for task in done if task.exception() is not None)
+        stop.set()
+        await prober
+        elapsed = time.perf_counter() - started
+
+        level = f"{rate:g}/s"
+        rows.append(summarize(
+            "arrivals", "submit->closed", level, results["closed"], elapsed,
+            rejected=results["rejected"], failed=results["failed"] + errors, unfinished=len(pending),
+        ))
+        rows.append(summarize("arrivals", "POST", level, results["submit"], submitted))
+        for name, latencies in samples.items():
+            rows.append(summarize("arrivals", f"GET {name}", level, latencies, elapsed))
+    return rows
+
+
+# --- table growth ---
+
+def prefill(target: int, texts: list[str]) -> int:
+    """Insert closed complaints until the local table has ``target`` rows."""
+    import database
+    from sqlalchemy import func, insert
+
+    from complaint_workflow.classifier import rule_labels
+
+    db = database.SessionLocal()
+    try:
+        count = db.query(func.count(database.Complaint.id)).scalar()
+        while count < target:
+            rows = []
+            for i in range(min(1000, target - count)):
+                text = texts[(count + i) % len(texts)]
+                now = datetime.now(timezone.utc).isoformat()
+                rows.append({
+                    "id": str(uuid.uuid4()),
+                    "complaint": text,
+                    "status": "closed",
+                    "categories": json.dumps(rule_labels(text) or ["other"]),
+                    "findings": "{}",
+                    "resolution": "Prefilled by loadtest.py",
+                    "closure_log": "",
+                    "state_json": "{}",
+                    "error": "",
+                    "duplicate_of": "",
+                    "worker_id": "",
+                    "lease_expires_at": "",
+                    "created_at": now,
+                    "updated_at": now,
+                })
+            db.execute(insert(database.Complaint).values(change_seq=database._next_change_seq()), rows)
+            db.commit()
+            count += len(rows)
+        return count
+    finally:
+        db.close()
+
+
+async def measure_endpoints(client, label: str, requests: int) -> list[dict]:
+    """Closed-loop list/detail requests against the table as it is now."""
+    samples = {"list": [], "list page 2": [], "list category": [], "detail": []}
+    first = await client.get("/api/complaints", params={"limit": 50})
+    first.raise_for_status()
+    page = first.json()
+    ids = [item["id"] for item in page["items"]]
+    for _ in range(requests):
+        await timed_get(client, "/api/complaints", samples["list"], limit=50)
+        if page["next_cursor"]:
+            await timed_get(client, "/api/complaints", samples["list page 2"], limit=50, cursor=page["next_cursor"])
+        await timed_get(client, "/api/complaints", samples["list category"], limit=50, category="portal")
+        if ids:
+            await timed_get(client, f"/api/complaints/{random.choice(ids)}", samples["detail"])
+    # Requests are interleaved, so each endpoint's throughput is over its own time.
+    return [
+        summarize("table", f"GET {name}", label, latencies, sum(latencies))
+        for name, latencies in samples.items()
+        if latencies
+    ]
+
+
+async def run_table(client, args, texts, local: bool) -> list[dict]:
+    if not local:
+        return await measure_endpoints(client, "current", args.table_requests)
+    rows = []
+    for size in sorted(args.table_sizes):
+        count = await asyncio.to_thread(prefill, size, texts)
+        rows += await measure_endpoints(client, f"{count} rows", args.table_requests)
+    return rows
+
+
+# --- report ---
+
+def print_rows(rows: list[dict], baseline: dict | None = None):
+    header = (
+        f"{'phase':<8} {'operation':<17} {'level':<11} {'ok':>5} {'rej':>4} {'fail':>4} "
+        f"{'ops/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    )
+    if baseline is not None:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+
+    def ms(value):
+        return f"{value * 1000:7.1f}m" if value is not None else "       -"
+
+    for r in rows:
+        line = (
+            f"{r['phase']:<8} {r['operation']:<17} {r['level']:<11} {r['ok']:>5} "
+            f"{r.get('rejected', 0):>4} {r.get('failed', 0) + r.get('unfinished', 0):>4} "
+            f"{r['throughput']:>7.1f} {ms(r['p50'])} {ms(r['p95'])} {ms(r['p99'])} {ms(r['max'])}"
+        )
+        if baseline is not None:
+            change = p95_change(r, baseline)
+            line += f" {change * 100:+11.0f}%" if change is not None else f" {'-':>12}"
+        print(line)
+
+
+def row_key(row: dict) -> tuple:
+    return row["phase"], row["operation"], row["level"]
+
+
+def p95_change(row: dict, baseline: dict) -> float | None:
+    """Relative p95 change against the matching baseline row, if any."""
+    base = baseline.get(row_key(row))
+    if not base or not base.get("p95") or row["p95"] is None:
+        return None
+    return row["p95"] / base["p95"] - 1
+
+
+def regressions(rows: list[dict], baseline: dict, threshold: float) -> list[dict]:
+    """Rows whose p95 grew by more than ``threshold``, or that lost requests
+    (rejections, failures, unfinished) the baseline did not."""
+    found = []
+    for row in rows:
+        base = baseline.get(row_key(row))
+        if base is None:
+            continue
+        change = p95_change(row, baseline)
+        lost = sum(row.get(k, 0) for k in ("rejected", "failed", "unfinished"))
+        base_lost = sum(base.get(k, 0) for k in ("rejected", "failed", "unfinished"))
+        if (change is not None and change > threshold) or lost > base_lost:
+            found.append(row)
+    return found
+
+
+async def main(args, base_url: str, local: bool):
+    import httpx
+
+    texts = complaint_texts(args.results)
+    rows = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        if args.skip != "arrivals":
+            rows += await run_arrivals(client, args, texts)
+        if args.skip != "table":
+            rows += await run_table(client, args, texts, local)
+    return rows
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    random.seed(args.seed)
+    local = not args.url
+    if local:
+        workdir = configure_environment(args, args.queue_depth)
+        quiet_server_logs()
+        uv, thread = start_server(port := free_port())
+        base_url = f"http://127.0.0.1:{port}"
+        print(
+            f"Local server {base_url}, fake LLM: {args.distribution} latency {args.latency}s "
+            f"jitter {args.jitter} error rate {args.error_rate} token latency {args.token_latency}s; "
+            f"workdir {workdir}\n"
+        )
+    else:
+        base_url = args.url.rstrip("/")
+        print(f"Server {base_url}\n")
+
+    try:
+        rows = asyncio.run(main(args, base_url, local))
+    finally:
+        if local:
+            uv.should_exit = True
+            thread.join()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {row_key(r): r for r in json.load(f)["rows"]}
+    print_rows(rows, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items()}, "rows": rows}, f, indent=2)
+
+    if baseline is not None:
+        worse = regressions(rows, baseline, args.threshold)
+        if worse:
+            print(f"\n{len(worse)} regression(s) against {args.baseline}:")
+            for row in worse:
+                print(f"  {row['phase']} {row['operation']} at {row['level']}")
+            sys.exit(1)
@@ -1,10 +1,15 @@
 import logging
+import os
 import sys
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from complaint_workflow import app, ComplaintState
+# Readable node events on the console rather than JSON lines.
+os.environ.setdefault("EVENT_LOG_FORMAT", "text")
+
+from complaint_workflow import app, ComplaintState, new_complaint_state
+from complaint_workflow import eventlog
 
 logger = logging.getLogger("complaint_workflow")
 
@@ -99,8 +104,12 @@ def visualize_workflow_path(state: ComplaintState) -> str:
                     f'  escalation={"yes" if state.get("requires_escalation") else "no"}'
                 )
             elif entry == "closure":
+                if "closure" in state.get("degraded_steps", []):
+                    satisfied = "unverified"
+                else:
+                    satisfied = "yes" if state.get("satisfaction_verified") else "no"
                 detail = (
-                    f'  satisfied={"yes" if state.get("satisfaction_verified") else "no"}'
+                    f'  satisfied={satisfied}'
                     f'  follow_up={"yes" if state.get("follow_up_required") else "no"}'
                 )
 
@@ -112,6 +121,17 @@ def visualize_workflow_path(state: ComplaintState) -> str:
     lines.append(f"  Result: {status_icon} {state.get('status', 'unknown')}")
     if state.get("closed_at"):
         lines.append(f"  Closed at: {state['closed_at']}")
+    if state.get("degraded_steps"):
+        lines.append(f"  Degraded (deadline): {', '.join(state['degraded_steps'])}")
+    if state.get("node_metrics"):
+        lines.append("")
+        lines.append("  Node timings:")
+        for m in state["node_metrics"]:
+            name = f'{m["node"]}:{m["category"]}' if m["category"] else m["node"]
+            lines.append(
+                f'    {name:<32} {m["seconds"]:>7.2f}s'
+                f'  tokens in={m["input_tokens"]} out={m["output_tokens"]}'
+            )
     lines.append("=" * 52)
 
     diagram = "\n".join(lines)
@@ -121,23 +141,15 @@ def visualize_workflow_path(state: ComplaintState) -> str:
 
 def run_complaint(text: str) -> ComplaintState:
     """Run a complaint through the full workflow and return the final state."""
-    initial_state: ComplaintState = {
-        "complaint": text,
-        "context": [],
-        "categories": [],
-        "resolution": "",
-        "workflow_path": [],
-        "status": "new",
-        "validation_results": {},
-        "investigation_findings": {},
-        "effectiveness_rating": "",
-        "requires_escalation": False,
-        "closure_log": "",
-        "satisfaction_verified": False,
-        "follow_up_required": False,
-        "closed_at": "",
-    }
-    result = app.invoke(initial_state)
+    result = app.invoke(new_complaint_state(text))
+    eventlog.flush()
+    return result
+
+
+async def arun_complaint(text: str) -> ComplaintState:
+    """Async variant of run_complaint; every node awaits the LLM on the event loop."""
+    result = await app.ainvoke(new_complaint_state(text))
+    eventlog.flush()
     return result
 
 
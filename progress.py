@@ -0,0 +1,57 @@
+"""In-process publish/subscribe of workflow progress, streamed to clients as SSE.
+
+process_complaint publishes an event whenever a node finishes or a
+complaint changes status, and relays the resolution text while it is
+generated; the server's event endpoints subscribe either to a single
+complaint or to every complaint (ALL) and forward what they receive as
+server-sent events.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import defaultdict
+
+ALL = "*"
+
+TERMINAL_STATUSES = {"closed", "error"}
+
+
+class ProgressBroker:
+    def __init__(self, max_queued: int = 1000):
+        self.max_queued = max_queued
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, key: str = ALL) -> asyncio.Queue:
+        """Queue receiving (event, data) tuples for one complaint id or ALL."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queued)
+        self._subscribers[key].add(queue)
+        return queue
+
+    def unsubscribe(self, key: str, queue: asyncio.Queue):
+        self._subscribers[key].discard(queue)
+        if not self._subscribers[key]:
+            del self._subscribers[key]
+
+    def publish(self, complaint_id: str, event: str, data: dict, broadcast: bool = True):
+        """Fan an event out to the complaint's subscribers and, if
+        ``broadcast``, to ALL.
+
+        Never blocks: a subscriber too slow to keep up loses events rather
+        than stalling the workflow.
+        """
+        data = {"id": complaint_id, **data}
+        for key in (complaint_id, ALL) if broadcast else (complaint_id,):
+            for queue in self._subscribers.get(key, ()):
+                try:
+                    queue.put_nowait((event, data))
+                except asyncio.QueueFull:
+                    pass
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+broker = ProgressBroker()
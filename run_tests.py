@@ -3,6 +3,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from main import run_complaint, visualize_workflow_path
+from complaint_workflow.classifier import intake_classifier
+from complaint_workflow.batching import batch_stats
+from complaint_workflow.callpolicy import call_stats
+from complaint_workflow.llm import limiter, llm_cache
+from complaint_workflow.nodes import speculation_stats
 
 test_complaints = [
     # Single-category complaints
@@ -31,3 +36,15 @@ with open("results.json", "w") as f:
     json.dump(results, f, indent=2, default=str)
 
 print(f"\nDone! Results saved to results.json")
+if llm_cache is not None:
+    print(f"LLM cache: {llm_cache.stats()}")
+if intake_classifier is not None:
+    print(f"Intake classifier: {intake_classifier.stats()}")
+if speculation_stats.launched:
+    print(f"Speculative investigations: {speculation_stats.stats()}")
+if limiter is not None:
+    print(f"LLM limiter: {limiter.stats()}")
+if call_stats.stats():
+    print(f"LLM call retries/timeouts/hedges: {call_stats.stats()}")
+if batch_stats():
+    print(f"LLM micro-batches: {batch_stats()}")
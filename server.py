@@ -1,24 +1,51 @@
+import asyncio
+import hashlib
+import json
 import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import BackgroundTasks, FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
-from langgraph.checkpoint.memory import MemorySaver
+import aiosqlite
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from pydantic import BaseModel
 
-from complaint_workflow import ComplaintState, compile_graph
+from complaint_workflow import compile_graph, new_complaint_state
+from complaint_workflow.callpolicy import call_stats
+from complaint_workflow.deadline import new_deadline
+from complaint_workflow.eventlog import complaint_context, emit
+from complaint_workflow.llm import limiter
+from complaint_workflow.metrics import percentiles, registry
+from complaint_workflow.nodes import aclosure_node
 from database import (
+    claim_complaint,
+    complaints_fingerprint,
     create_complaint,
+    create_complaints,
     get_complaint,
+    get_complaint_status,
     init_db,
+    list_changes,
+    list_claimable_complaints,
     list_complaints,
+    list_finished_ids,
+    list_indexable_complaints,
+    list_node_metrics,
     mark_error,
-    mark_processing,
+    renew_lease,
     save_workflow_result,
 )
+from job_queue import JobQueue, QueueClosed
+from progress import ALL, TERMINAL_STATUSES, broker, format_sse
+from similarity import ComplaintIndex
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,10 +56,99 @@ logger = logging.getLogger("server")
 
 app = FastAPI(title="Complaint Workflow")
 
+# Near-duplicate reuse: a submission whose estimated similarity to an already
+# closed complaint reaches DEDUP_THRESHOLD reuses that complaint's results.
+DEDUP_ENABLED = os.environ.get("DEDUP", "1") != "0"
+DEDUP_RERUN_CLOSURE = os.environ.get("DEDUP_RERUN_CLOSURE", "0") == "1"
+complaint_index = ComplaintIndex(threshold=float(os.environ.get("DEDUP_THRESHOLD", "0.9")))
+_index_synced_seq = 0
+
+# Workflow checkpoints survive restarts so an interrupted complaint resumes
+# from its last completed node. A finished complaint's checkpoints are kept
+# for CHECKPOINT_RETENTION_SECONDS after it closes, then deleted.
+CHECKPOINT_DB = os.environ.get("CHECKPOINT_DB", "checkpoints.db")
+CHECKPOINT_RETENTION_SECONDS = float(os.environ.get("CHECKPOINT_RETENTION_SECONDS", "86400"))
+CHECKPOINT_PRUNE_INTERVAL = float(os.environ.get("CHECKPOINT_PRUNE_INTERVAL", "3600"))
+
+# Backpressure: at most WORKER_COUNT workflows run at once and at most
+# QUEUE_MAX_DEPTH wait behind them; beyond that submissions get a 429.
+WORKER_COUNT = int(os.environ.get("WORKER_COUNT", "8"))
+QUEUE_MAX_DEPTH = int(os.environ.get("QUEUE_MAX_DEPTH", "100"))
+SHUTDOWN_DRAIN_SECONDS = float(os.environ.get("SHUTDOWN_DRAIN_SECONDS", "30"))
+
+# Work claiming: a process only runs a complaint after claiming it in the
+# database under a lease it renews every LEASE_SECONDS / 3. Rows nobody
+# holds - new ones, or ones whose worker died and let the lease expire - are
+# swept into the local queue every SWEEP_INTERVAL seconds. With
+# PROCESS_IN_API=0 the API only records complaints and standalone
+# `worker.py` processes do all of the processing.
+PROCESS_IN_API = os.environ.get("PROCESS_IN_API", "1") != "0"
+LEASE_SECONDS = float(os.environ.get("LEASE_SECONDS", "60"))
+SWEEP_INTERVAL = float(os.environ.get("SWEEP_INTERVAL", "5"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "10000"))
+
+# Event streams send a comment line this often so proxies keep them open;
+# per-complaint streams also re-check the database status then, which is how
+# they notice completions made by standalone workers in other processes.
+SSE_KEEPALIVE_SECONDS = float(os.environ.get("SSE_KEEPALIVE_SECONDS", "15"))
+
+# Compiled once at startup, shared by every complaint (one thread per id).
+graph = None
+checkpointer: AsyncSqliteSaver | None = None
+job_queue: JobQueue | None = None
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(coro):
+    """Run a coroutine in the background, keeping a reference until it ends."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def init_workflow():
+    """Open the checkpoint store and compile the shared graph."""
+    global graph, checkpointer
+    checkpointer = AsyncSqliteSaver(await aiosqlite.connect(CHECKPOINT_DB))
+    await checkpointer.setup()
+    graph = compile_graph(checkpointer=checkpointer)
+
+
+async def close_workflow():
+    if checkpointer is not None:
+        await checkpointer.conn.close()
+
 
 @app.on_event("startup")
-def startup():
+async def startup():
+    global job_queue
     init_db()
+    await init_workflow()
+
+    if DEDUP_ENABLED:
+        sync_duplicate_index()
+        logger.info("Duplicate index loaded with %d complaints", len(complaint_index))
+
+    if PROCESS_IN_API:
+        job_queue = JobQueue(workers=WORKER_COUNT, max_depth=QUEUE_MAX_DEPTH)
+        job_queue.start()
+
+    # The first sweep also picks up complaints left unfinished by a restart.
+    _spawn(sweep_periodically())
+    _spawn(prune_checkpoints_periodically())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if job_queue is not None:
+        await job_queue.drain(SHUTDOWN_DRAIN_SECONDS)
+    for task in list(_background_tasks):
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    await close_workflow()
 
 
 # --- Models ---
@@ -43,53 +159,335 @@ class ComplaintRequest(BaseModel):
 
 # --- Background processing ---
 
-def process_complaint(complaint_id: str, text: str):
+def _enqueue(complaint_id: str, text: str, duplicate_of: str = "") -> int | None:
+    if job_queue is None:
+        return None  # PROCESS_IN_API=0: a standalone worker will claim it
+    row = {"id": complaint_id, "complaint": text, "duplicate_of": duplicate_of}
+    return job_queue.submit(complaint_id, run_claimable, row)
+
+
+async def _claim(complaint_id: str) -> bool:
+    if await run_in_threadpool(claim_complaint, complaint_id, WORKER_ID, LEASE_SECONDS):
+        return True
+    emit("server", "already claimed")
+    return False
+
+
+async def _heartbeat(complaint_id: str):
+    """Keep renewing the lease on a claimed complaint until cancelled."""
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        if not await run_in_threadpool(renew_lease, complaint_id, WORKER_ID, LEASE_SECONDS):
+            # Another worker reclaimed it; our result will not be saved.
+            emit("server", "lost lease", logging.WARNING)
+            return
+
+
+async def run_claimable(row: dict):
+    """Process a row from list_claimable_complaints/claim_complaints.
+
+    Everything emitted to the event log meanwhile, by the server or by the
+    workflow nodes, is tagged with the complaint id.
+    """
+    with complaint_context(row["id"]):
+        if row["duplicate_of"]:
+            await process_duplicate(row["id"], row["complaint"], row["duplicate_of"])
+        else:
+            await process_complaint(row["id"], row["complaint"])
+
+
+def _node_event(node: str, update: dict | None) -> dict:
+    """SSE payload for a finished node: a readable step label plus its update."""
+    update = update or {}
+    if node in ("validate_category", "speculate_category"):
+        step = "validation:" + next(iter(update.get("validation_results", {})), "")
+    else:
+        step = (update.get("workflow_path") or [node])[-1]
+    return {"node": node, "step": step, "update": update}
+
+
+async def process_complaint(complaint_id: str, text: str):
+    # Runs on the event loop: LLM calls are awaited via graph.astream, and the
+    # short blocking SQLite writes are pushed to the threadpool.
+    if not await _claim(complaint_id):
+        return
+    broker.publish(complaint_id, "status", {"status": "processing"})
+    heartbeat = asyncio.create_task(_heartbeat(complaint_id))
     try:
-        mark_processing(complaint_id)
-        checkpointer = MemorySaver()
-        graph = compile_graph(checkpointer=checkpointer)
-        initial_state: ComplaintState = {
-            "complaint": text,
-            "context": [],
-            "categories": [],
-            "resolution": "",
-            "workflow_path": [],
-            "status": "new",
-            "validation_results": {},
-            "investigation_findings": {},
-            "effectiveness_rating": "",
-            "requires_escalation": False,
-            "closure_log": "",
-            "satisfaction_verified": False,
-            "follow_up_required": False,
-            "closed_at": "",
-        }
-        result = graph.invoke(
-            initial_state,
-            config={"configurable": {"thread_id": complaint_id}},
-        )
-        save_workflow_result(complaint_id, result)
-        logger.info("Complaint %s processed successfully", complaint_id)
-    except Exception:
-        logger.exception("Error processing complaint %s", complaint_id)
+        config = {"configurable": {"thread_id": complaint_id}}
+        snapshot = await graph.aget_state(config)
+        if snapshot.values and not snapshot.next:
+            # The workflow finished but the result never reached the database.
+            result = snapshot.values
+        else:
+            if snapshot.values:
+                emit("server", "resuming", next=list(snapshot.next))
+                # The saved deadline has usually passed by the time a lease is
+                # reclaimed, so the resumed run gets a fresh budget through its
+                # config (see deadline.py); finished branches are not rerun.
+                config["configurable"]["deadline"] = new_deadline()
+            inputs = None if snapshot.values else new_complaint_state(text)
+            async for mode, chunk in graph.astream(
+                inputs, config=config, stream_mode=["updates", "custom"]
+            ):
+                if mode == "custom":
+                    # Streamed resolution text: only for this complaint's own
+                    # subscribers, the dashboard-wide stream would drown in it.
+                    payload = dict(chunk)
+                    broker.publish(complaint_id, payload.pop("event"), payload, broadcast=False)
+                    continue
+                for node, update in chunk.items():
+                    broker.publish(complaint_id, "node", _node_event(node, update))
+            result = (await graph.aget_state(config)).values
+        if not await run_in_threadpool(save_workflow_result, complaint_id, result, WORKER_ID):
+            emit("server", "reclaimed, result discarded", logging.WARNING)
+            return
+        broker.publish(complaint_id, "status", {"status": "closed"})
+        if DEDUP_ENABLED:
+            complaint_index.add(complaint_id, text)
+        emit("server", "processed")
+    except Exception as exc:
+        emit("server", "failed", logging.ERROR, exc_info=exc)
         import traceback
-        mark_error(complaint_id, traceback.format_exc())
+        await run_in_threadpool(mark_error, complaint_id, traceback.format_exc(), WORKER_ID)
+        broker.publish(complaint_id, "status", {"status": "error"})
+    finally:
+        heartbeat.cancel()
+
+
+def sync_duplicate_index():
+    """Add complaints closed since the last sync (by any process) to the index."""
+    global _index_synced_seq
+    for complaint_id, text, change_seq in list_indexable_complaints(_index_synced_seq):
+        complaint_index.add(complaint_id, text)
+        _index_synced_seq = max(_index_synced_seq, change_seq)
+
+
+async def sweep_claimable():
+    """Queue claimable complaints this process is not already holding."""
+    free = job_queue.max_depth - job_queue.depth
+    if free <= 0 or job_queue.closing:
+        return
+    rows = await run_in_threadpool(
+        list_claimable_complaints, free + job_queue.depth + job_queue.workers
+    )
+    queued = 0
+    for row in rows:
+        if queued == free:
+            break
+        if job_queue.position(row["id"]) is None:
+            job_queue.submit(row["id"], run_claimable, row)
+            queued += 1
+    if queued:
+        logger.info("Swept %d unclaimed complaints into the queue", queued)
+
+
+async def sweep_periodically():
+    while True:
+        try:
+            if job_queue is not None:
+                await sweep_claimable()
+            if DEDUP_ENABLED:
+                await run_in_threadpool(sync_duplicate_index)
+        except Exception:
+            logger.exception("Sweep failed")
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+
+async def prune_checkpoints():
+    """Delete the checkpoints of complaints finished longer ago than the retention."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=CHECKPOINT_RETENTION_SECONDS)
+    expired = set(await run_in_threadpool(list_finished_ids, cutoff.isoformat()))
+    async with checkpointer.conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cur:
+        stored = {row[0] async for row in cur}
+    for thread_id in stored & expired:
+        await checkpointer.adelete_thread(thread_id)
+    if stored & expired:
+        logger.info("Pruned checkpoints of %d finished complaints", len(stored & expired))
+
+
+async def prune_checkpoints_periodically():
+    while True:
+        try:
+            await prune_checkpoints()
+        except Exception:
+            logger.exception("Checkpoint pruning failed")
+        await asyncio.sleep(CHECKPOINT_PRUNE_INTERVAL)
+
+
+async def process_duplicate(complaint_id: str, text: str, original_id: str):
+    """Close a near-duplicate by reusing the original complaint's results.
+
+    Categories, validation, findings and resolution are copied as-is; with
+    DEDUP_RERUN_CLOSURE=1 the closure step is re-run against the new text.
+    """
+    if not await _claim(complaint_id):
+        return
+    broker.publish(complaint_id, "status", {"status": "processing"})
+    heartbeat = asyncio.create_task(_heartbeat(complaint_id))
+    try:
+        original = await run_in_threadpool(get_complaint, original_id)
+        # The original's node timings are not this complaint's.
+        state = {**original["state_json"], "complaint": text, "node_metrics": []}
+        if DEDUP_RERUN_CLOSURE:
+            path = [
+                step for step in state.get("workflow_path", [])
+                if step not in ("closure", "closure_blocked")
+            ]
+            degraded = [step for step in state.get("degraded_steps", []) if step != "closure"]
+            state["workflow_path"] = path
+            state["degraded_steps"] = degraded
+            # The re-run closure gets a budget of its own.
+            state["deadline"] = new_deadline()
+            update = await aclosure_node(state)
+            state.update(update)
+            state["workflow_path"] = path + update["workflow_path"]
+            state["degraded_steps"] = degraded + update.get("degraded_steps", [])
+        if await run_in_threadpool(save_workflow_result, complaint_id, state, WORKER_ID):
+            broker.publish(complaint_id, "status", {"status": "closed"})
+            emit("server", "closed as duplicate", original_id=original_id)
+    except Exception as exc:
+        emit("server", "failed", logging.ERROR, exc_info=exc, duplicate_of=original_id)
+        import traceback
+        await run_in_threadpool(mark_error, complaint_id, traceback.format_exc(), WORKER_ID)
+        broker.publish(complaint_id, "status", {"status": "error"})
+    finally:
+        heartbeat.cancel()
 
 
 # --- API endpoints ---
 
+def _check_capacity(need_slot: bool = True):
+    if job_queue is None:
+        return
+    if job_queue.closing:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is shutting down",
+            headers={"Retry-After": str(job_queue.retry_after())},
+        )
+    if need_slot and job_queue.is_full():
+        raise HTTPException(
+            status_code=429,
+            detail="Too many complaints in progress, try again later",
+            headers={"Retry-After": str(job_queue.retry_after())},
+        )
+
+
 @app.post("/api/complaints")
-def submit_complaint(req: ComplaintRequest, background_tasks: BackgroundTasks):
+async def submit_complaint(req: ComplaintRequest):
     if not req.complaint.strip():
         raise HTTPException(status_code=400, detail="Complaint text is required")
-    record = create_complaint(req.complaint.strip())
-    background_tasks.add_task(process_complaint, record["id"], req.complaint.strip())
+    _check_capacity()
+    text = req.complaint.strip()
+    match = complaint_index.find(text) if DEDUP_ENABLED else None
+    duplicate_of, similarity = match if match else ("", None)
+    record = await run_in_threadpool(create_complaint, text, duplicate_of)
+    broker.publish(record["id"], "status", {"status": record["status"]})
+    try:
+        position = _enqueue(record["id"], text, duplicate_of)
+    except QueueClosed:
+        # Stays 'submitted' and is resumed on the next startup.
+        position = None
+    record["queue_position"] = position
+    if duplicate_of:
+        record.update(duplicate_of=duplicate_of, similarity=similarity)
     return record
 
 
+def _parse_batch(body: bytes, content_type: str) -> list[str]:
+    """Complaint texts from a JSON array or an NDJSON body. Items may be plain
+    strings or objects with a "complaint" field."""
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {exc}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON lines")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} complaints"
+        )
+
+    texts = []
+    for index, item in enumerate(items):
+        text = item.get("complaint") if isinstance(item, dict) else item
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPException(
+                status_code=400, detail=f"Item {index}: complaint text is required"
+            )
+        texts.append(text.strip())
+    return texts
+
+
+@app.post("/api/complaints/batch")
+async def submit_batch(request: Request):
+    """Insert a whole batch in one transaction and queue what fits right away.
+
+    The rest stay 'submitted' and are swept into the queue as workers free up,
+    so a large batch is accepted in one round trip instead of being rejected.
+    """
+    texts = _parse_batch(await request.body(), request.headers.get("content-type", ""))
+    _check_capacity(need_slot=False)
+
+    duplicate_of = []
+    for text in texts:
+        match = complaint_index.find(text) if DEDUP_ENABLED else None
+        duplicate_of.append(match[0] if match else "")
+    records = await run_in_threadpool(create_complaints, texts, duplicate_of)
+    for record in records:
+        broker.publish(record["id"], "status", {"status": record["status"]})
+
+    queued = 0
+    if job_queue is not None:
+        free = max(job_queue.max_depth - job_queue.depth, 0)
+        for record, text, dup in list(zip(records, texts, duplicate_of))[:free]:
+            _enqueue(record["id"], text, dup)
+            queued += 1
+
+    return {
+        "ids": [record["id"] for record in records],
+        "count": len(records),
+        "queued": queued,
+        "duplicates": sum(1 for dup in duplicate_of if dup),
+    }
+
+
 @app.get("/api/complaints")
-def list_all():
-    return list_complaints()
+def list_all(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    status: str | None = None,
+    category: str | None = None,
+):
+    # The ETag covers the whole table (not just this page), so any insert or
+    # update anywhere invalidates it; an unchanged table costs two index
+    # lookups and a 304.
+    fingerprint = f"{complaints_fingerprint()}|{limit}|{cursor}|{status}|{category}"
+    etag = '"' + hashlib.sha1(fingerprint.encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    try:
+        page = list_complaints(limit=limit, cursor=cursor, status=status, category=category)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    response.headers.update(headers)
+    return page
+
+
+@app.get("/api/complaints/changes")
+def list_changed(since: str | None = None, limit: int = Query(200, ge=1, le=1000)):
+    """Delta feed of complaints created or updated after the ``since`` cursor."""
+    try:
+        return list_changes(since=since, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.get("/api/complaints/{complaint_id}")
@@ -97,9 +495,84 @@ def get_one(complaint_id: str):
     record = get_complaint(complaint_id)
     if not record:
         raise HTTPException(status_code=404, detail="Complaint not found")
+    record["queue_position"] = job_queue.position(complaint_id) if job_queue else None
     return record
 
 
+async def _event_stream(key: str):
+    """Server-sent events for one complaint id, or for every complaint (ALL)."""
+    queue = broker.subscribe(key)
+    try:
+        if key != ALL:
+            status = await run_in_threadpool(get_complaint_status, key)
+            yield format_sse("status", {"id": key, "status": status})
+            if status in TERMINAL_STATUSES:
+                return
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if key != ALL:
+                    status = await run_in_threadpool(get_complaint_status, key)
+                    if status in TERMINAL_STATUSES:
+                        yield format_sse("status", {"id": key, "status": status})
+                        return
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event, data)
+            if key != ALL and event == "status" and data["status"] in TERMINAL_STATUSES:
+                return
+    finally:
+        broker.unsubscribe(key, queue)
+
+
+@app.get("/api/events")
+def all_events():
+    """Progress of every complaint handled by this process, as one SSE stream."""
+    return StreamingResponse(_event_stream(ALL), media_type="text/event-stream")
+
+
+@app.get("/api/complaints/{complaint_id}/events")
+def complaint_events(complaint_id: str):
+    """Per-node progress of one complaint as SSE; ends once it is closed or errored."""
+    if get_complaint_status(complaint_id) is None:
+        raise HTTPException(status_code=404, detail="Complaint not found")
+    return StreamingResponse(_event_stream(complaint_id), media_type="text/event-stream")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Per-node latency histograms and token counters of this process, plus
+    LLM retry/timeout/hedge counts and the limiter's queue times and
+    concurrency limit, for Prometheus."""
+    body = registry.render() + call_stats.render() + (limiter.render() if limiter is not None else "")
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/metrics/stages")
+def stage_metrics(
+    since: str = "",
+    by_category: bool = False,
+    limit: int = Query(10_000, ge=1, le=100_000),
+):
+    """Latency percentiles and token totals per workflow node, over the
+    newest ``limit`` node runs stored for complaints closed after ``since``
+    (all processes and workers)."""
+    groups: dict[str, list[dict]] = {}
+    for run in list_node_metrics(since, limit):
+        key = f"{run['node']}:{run['category']}" if by_category and run["category"] else run["node"]
+        groups.setdefault(key, []).append(run)
+    return {
+        key: {
+            "count": len(runs),
+            **percentiles([r["seconds"] for r in runs]),
+            "input_tokens": sum(r["input_tokens"] for r in runs),
+            "output_tokens": sum(r["output_tokens"] for r in runs),
+        }
+        for key, runs in sorted(groups.items())
+    }
+
+
 # --- HTML frontend ---
 
 HTML_PAGE = """\
@@ -158,7 +631,15 @@ HTML_PAGE = """\
 
 <div class="card">
   <h2 style="margin-bottom:.75rem">Complaints</h2>
-  <div id="table-wrap"></div>
+  <select id="status-filter" onchange="resetList()" style="margin-bottom:.75rem">
+    <option value="">All statuses</option>
+    <option value="submitted">Submitted</option>
+    <option value="processing">Processing</option>
+    <option value="closed">Closed</option>
+    <option value="error">Error</option>
+  </select>
+  <div id="table-wrap"><p class="empty">No complaints yet.</p></div>
+  <div id="more-wrap"></div>
 </div>
 
 <div class="modal-bg" id="modal-bg">
@@ -175,13 +656,19 @@ document.getElementById('form').addEventListener('submit', async e => {
   const btn = document.getElementById('btn');
   btn.disabled = true;
   try {
-    await fetch(API, {
+    const res = await fetch(API, {
       method: 'POST',
       headers: {'Content-Type': 'application/json'},
       body: JSON.stringify({complaint: text})
     });
+    if (!res.ok) {
+      const err = await res.json();
+      const retry = res.headers.get('Retry-After');
+      alert(err.detail + (retry ? ` (retry in ${retry}s)` : ''));
+      return;
+    }
     document.getElementById('text').value = '';
-    loadComplaints();
+    pollChanges();
   } finally { btn.disabled = false; }
 });
 
@@ -193,32 +680,154 @@ function truncate(s, n) {
   return s.length > n ? s.slice(0, n) + '...' : s;
 }
 
+// Rows shown so far, by id. The newest page is loaded once; after that only
+// rows reported by the event stream or the change feed are patched in place.
+// "Load more" walks older pages with the keyset cursor from the API.
+const PAGE_SIZE = 50;
+let rows = new Map();
+let nextCursor = null;
+let olderLoaded = false;
+
+function listUrl(cursor) {
+  const params = new URLSearchParams({limit: PAGE_SIZE});
+  const status = statusFilter();
+  if (status) params.set('status', status);
+  if (cursor) params.set('cursor', cursor);
+  return API + '?' + params;
+}
+
+function statusFilter() {
+  return document.getElementById('status-filter').value;
+}
+
+async function fetchPage(cursor) {
+  // The list endpoint sends an ETag with Cache-Control: no-cache, so the
+  // browser revalidates and an unchanged table comes back as a 304.
+  const res = await fetch(listUrl(cursor));
+  const page = await res.json();
+  for (const c of page.items) upsertRow(c);
+  return page;
+}
+
 async function loadComplaints() {
-  const res = await fetch(API);
-  const data = await res.json();
-  const wrap = document.getElementById('table-wrap');
-  if (!data.length) { wrap.innerHTML = '<p class="empty">No complaints yet.</p>'; return; }
-  let html = '<table><tr><th>ID</th><th>Complaint</th><th>Status</th><th>Created</th></tr>';
-  for (const c of data) {
-    const created = new Date(c.created_at).toLocaleString();
-    html += `<tr>
-      <td><span class="id-link" onclick="showDetail('${c.id}')">${c.id.slice(0,8)}</span></td>
-      <td>${esc(truncate(c.complaint, 80))}</td>
-      <td>${badge(c.status)}</td>
-      <td>${created}</td>
-    </tr>`;
+  const page = await fetchPage(null);
+  if (!olderLoaded) nextCursor = page.next_cursor;
+  renderMore();
+}
+
+async function loadMore() {
+  const page = await fetchPage(nextCursor);
+  olderLoaded = true;
+  nextCursor = page.next_cursor;
+  renderMore();
+}
+
+function resetList() {
+  rows = new Map();
+  nextCursor = null;
+  olderLoaded = false;
+  document.getElementById('table-wrap').innerHTML = '<p class="empty">No complaints yet.</p>';
+  loadComplaints();
+}
+
+function renderMore() {
+  document.getElementById('more-wrap').innerHTML =
+    nextCursor ? '<button onclick="loadMore()">Load more</button>' : '';
+}
+
+function tableBody() {
+  let table = document.getElementById('complaints-table');
+  if (!table) {
+    document.getElementById('table-wrap').innerHTML =
+      '<table id="complaints-table"><tbody><tr><th>ID</th><th>Complaint</th>' +
+      '<th>Status</th><th>Step</th><th>Created</th></tr></tbody></table>';
+    table = document.getElementById('complaints-table');
+  }
+  return table.tBodies[0];
+}
+
+function rowHtml(c) {
+  const created = new Date(c.created_at).toLocaleString();
+  const step = c.status === 'processing' && c.step ? c.step : '';
+  return `<td><span class="id-link" onclick="showDetail('${c.id}')">${c.id.slice(0,8)}</span></td>
+    <td>${esc(truncate(c.complaint, 80))}</td>
+    <td>${badge(c.status)}</td>
+    <td>${esc(step)}</td>
+    <td>${created}</td>`;
+}
+
+// Insert or update a single row, keeping newest-first order. Rows outside
+// the status filter are only updated if already shown.
+function upsertRow(c) {
+  const known = rows.get(c.id);
+  const filter = statusFilter();
+  if (!known && (!c.created_at || (filter && c.status !== filter))) return;
+  const merged = {...known, ...c};
+  rows.set(c.id, merged);
+
+  const body = tableBody();
+  let tr = document.getElementById('row-' + c.id);
+  if (!tr) {
+    tr = document.createElement('tr');
+    tr.id = 'row-' + c.id;
+    tr.dataset.created = merged.created_at;
+    const next = [...body.querySelectorAll('tr[data-created]')]
+      .find(r => r.dataset.created < merged.created_at);
+    body.insertBefore(tr, next || null);
   }
-  html += '</table>';
-  wrap.innerHTML = html;
+  tr.innerHTML = rowHtml(merged);
+}
+
+// While a complaint is open and still running, follow its own event stream
+// so the resolution shows up token by token as it is generated.
+let detailEvents = null;
+
+function followResolution(id) {
+  if (detailEvents) detailEvents.close();
+  detailEvents = new EventSource(API + '/' + id + '/events');
+  detailEvents.addEventListener('resolution_token', e => {
+    const d = JSON.parse(e.data);
+    document.getElementById('live-resolution-wrap').style.display = '';
+    document.getElementById('live-resolution').textContent += d.delta;
+  });
+  detailEvents.addEventListener('resolution_reset', () => {
+    document.getElementById('live-resolution').textContent = '';
+    const flags = document.getElementById('live-resolution-flags');
+    flags.textContent = '';
+    delete flags.dataset.effectiveness;
+    delete flags.dataset.escalation;
+  });
+  detailEvents.addEventListener('resolution_parsed', e => {
+    const d = JSON.parse(e.data);
+    const flags = document.getElementById('live-resolution-flags');
+    if ('effectiveness_rating' in d) flags.dataset.effectiveness = 'Effectiveness: ' + d.effectiveness_rating;
+    if (d.requires_escalation) flags.dataset.escalation = 'Escalation required';
+    flags.textContent = [flags.dataset.effectiveness, flags.dataset.escalation].filter(Boolean).join(' \u00b7 ');
+  });
+  detailEvents.addEventListener('status', e => {
+    if (TERMINAL.has(JSON.parse(e.data).status)) stopFollowing();
+  });
+}
+
+function stopFollowing() {
+  if (detailEvents) detailEvents.close();
+  detailEvents = null;
 }
 
 async function showDetail(id) {
+  openDetailId = id;
   const res = await fetch(API + '/' + id);
   const c = await res.json();
   const modal = document.getElementById('modal');
   let html = `<button class="close" onclick="closeModal()">&times;</button>`;
   html += `<h2>Complaint ${c.id.slice(0,8)} ${badge(c.status)}</h2>`;
+  if (c.queue_position) {
+    html += `<p class="section-label">Queue Position</p><pre>${c.queue_position}</pre>`;
+  }
   html += `<p class="section-label">Complaint</p><pre>${esc(c.complaint)}</pre>`;
+  if (c.duplicate_of) {
+    html += `<p class="section-label">Duplicate Of</p><pre><span class="id-link" onclick="showDetail('${c.duplicate_of}')">${c.duplicate_of.slice(0,8)}</span></pre>`;
+  }
   if (c.categories.length) {
     html += `<p class="section-label">Categories</p><pre>${esc(c.categories.join(', '))}</pre>`;
   }
@@ -228,6 +837,12 @@ async function showDetail(id) {
   if (c.resolution) {
     html += `<p class="section-label">Resolution</p><pre>${esc(c.resolution)}</pre>`;
   }
+  const following = !c.resolution && !TERMINAL.has(c.status);
+  if (following) {
+    html += `<div id="live-resolution-wrap" style="display:none">
+      <p class="section-label">Resolution (generating) <span id="live-resolution-flags"></span></p>
+      <pre id="live-resolution"></pre></div>`;
+  }
   if (c.closure_log) {
     html += `<p class="section-label">Closure Log</p><pre>${esc(c.closure_log)}</pre>`;
   }
@@ -238,9 +853,14 @@ async function showDetail(id) {
   html += `<p class="section-label">Updated</p><pre>${new Date(c.updated_at).toLocaleString()}</pre>`;
   modal.innerHTML = html;
   document.getElementById('modal-bg').classList.add('open');
+  if (following) followResolution(id); else stopFollowing();
 }
 
-function closeModal() { document.getElementById('modal-bg').classList.remove('open'); }
+function closeModal() {
+  openDetailId = null;
+  stopFollowing();
+  document.getElementById('modal-bg').classList.remove('open');
+}
 document.getElementById('modal-bg').addEventListener('click', e => {
   if (e.target === e.currentTarget) closeModal();
 });
@@ -251,8 +871,49 @@ function esc(s) {
   return d.innerHTML;
 }
 
-loadComplaints();
-setInterval(loadComplaints, 3000);
+// Live updates: the server-sent event stream patches rows as this server
+// processes them; the change feed catches everything else (other API
+// processes, standalone workers, missed events) at almost no cost when
+// nothing changed.
+const TERMINAL = new Set(['closed', 'error']);
+const CHANGES_INTERVAL_MS = 5000;
+let openDetailId = null;
+let changesCursor = null;
+let changesTimer = null;
+
+async function pollChanges() {
+  clearTimeout(changesTimer);
+  try {
+    let page;
+    do {
+      const params = changesCursor ? '?since=' + encodeURIComponent(changesCursor) : '';
+      page = await (await fetch(API + '/changes' + params)).json();
+      for (const c of page.items) {
+        upsertRow(c);
+        if (openDetailId === c.id && TERMINAL.has(c.status)) showDetail(c.id);
+      }
+      changesCursor = page.cursor || changesCursor;
+    } while (page.has_more);
+  } finally {
+    changesTimer = setTimeout(pollChanges, CHANGES_INTERVAL_MS);
+  }
+}
+
+const events = new EventSource('/api/events');
+events.addEventListener('status', e => {
+  const d = JSON.parse(e.data);
+  if (!rows.has(d.id)) { pollChanges(); return; }
+  upsertRow({id: d.id, status: d.status});
+  if (openDetailId === d.id && TERMINAL.has(d.status)) showDetail(d.id);
+});
+events.addEventListener('node', e => {
+  const d = JSON.parse(e.data);
+  if (rows.has(d.id)) upsertRow({id: d.id, step: d.step});
+});
+
+// Take the change cursor before loading the first page so nothing that
+// changes in between is missed.
+pollChanges().then(loadComplaints);
 </script>
 </body>
 </html>
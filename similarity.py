@@ -0,0 +1,110 @@
+"""Near-duplicate detection over complaint text (MinHash + LSH, pure Python).
+
+A single incident tends to produce many near-identical complaints. The
+server keeps a ComplaintIndex of closed complaints so a new submission that
+is close enough to one of them can reuse its finished results instead of
+running the whole workflow again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import defaultdict
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "is", "are", "was", "were", "be", "been",
+    "it", "its", "this", "that", "of", "to", "in", "on", "at", "for", "with", "my",
+    "i", "we", "our", "do", "does", "how", "what", "why", "when", "every", "each",
+}
+
+
+def _permutations() -> list[tuple[int, int]]:
+    # Deterministic across processes so signatures stay comparable.
+    perms = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % _MERSENNE or 1
+        b = int.from_bytes(digest[8:], "big") % _MERSENNE
+        perms.append((a, b))
+    return perms
+
+
+_PERMS = _permutations()
+
+
+def shingles(text: str) -> set[str]:
+    """Word unigrams and bigrams of the normalized text, minus stopwords."""
+    tokens = [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+    grams = set(tokens)
+    grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return grams
+
+
+def minhash(text: str) -> tuple[int, ...]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+        for s in shingles(text)
+    ]
+    if not hashes:
+        return (_MAX_HASH,) * NUM_PERM
+    return tuple(
+        min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashes) for a, b in _PERMS
+    )
+
+
+def estimate_similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+class ComplaintIndex:
+    """Thread-safe LSH index mapping complaint ids to MinHash signatures."""
+
+    def __init__(self, threshold: float = 0.9):
+        self.threshold = threshold
+        self._signatures: dict[str, tuple[int, ...]] = {}
+        self._buckets: dict[tuple, set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _bands(sig: tuple[int, ...]):
+        for band in range(BANDS):
+            yield (band, *sig[band * ROWS:(band + 1) * ROWS])
+
+    def add(self, complaint_id: str, text: str):
+        sig = minhash(text)
+        with self._lock:
+            self._signatures[complaint_id] = sig
+            for key in self._bands(sig):
+                self._buckets[key].add(complaint_id)
+
+    def find(self, text: str, threshold: float | None = None) -> tuple[str, float] | None:
+        """Return (complaint_id, similarity) of the closest indexed complaint, if
+        its estimated similarity reaches the threshold."""
+        threshold = self.threshold if threshold is None else threshold
+        sig = minhash(text)
+        with self._lock:
+            candidates = set()
+            for key in self._bands(sig):
+                candidates |= self._buckets.get(key, set())
+            scored = [
+                (cid, estimate_similarity(sig, self._signatures[cid]))
+                for cid in candidates
+            ]
+        best = max(scored, key=lambda item: item[1], default=None)
+        if best is None or best[1] < threshold:
+            return None
+        return best
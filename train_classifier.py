@@ -0,0 +1,69 @@
+"""Train the local intake classifier from earlier LLM categorizations.
+
+Uses every closed complaint in the database whose categories came from the
+LLM, plus results.json from run_tests.py, and writes the model to
+INTAKE_CLASSIFIER_MODEL (default .intake_classifier.json), where the intake
+node loads it on the next start:
+
+    python train_classifier.py
+"""
+
+import argparse
+import json
+import os
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from complaint_workflow.classifier import IntakeClassifier
+from database import init_db, list_llm_categorized_complaints
+
+
+def load_results(path: str) -> list[tuple[str, list[str]]]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        results = json.load(f)
+    return [
+        (r["complaint"], r["categories"])
+        for r in results
+        if r.get("categories") and r.get("categorized_by", "llm") == "llm"
+    ]
+
+
+def evaluate(classifier: IntakeClassifier, examples: list[tuple[str, list[str]]]) -> dict:
+    """Fraction of examples answered locally, and how many of those match."""
+    answered = correct = 0
+    for text, categories in examples:
+        prediction = classifier.predict(text)
+        if prediction is None or prediction.confidence < classifier.threshold:
+            continue
+        answered += 1
+        correct += set(prediction.categories) == set(categories)
+    return {
+        "examples": len(examples),
+        "answered_locally": answered,
+        "accuracy_when_answered": correct / answered if answered else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--results", default="results.json")
+    parser.add_argument(
+        "--output", default=os.environ.get("INTAKE_CLASSIFIER_MODEL", ".intake_classifier.json")
+    )
+    parser.add_argument(
+        "--threshold", type=float,
+        default=float(os.environ.get("INTAKE_CLASSIFIER_THRESHOLD", "0.9")),
+    )
+    args = parser.parse_args()
+
+    init_db()
+    examples = list_llm_categorized_complaints() + load_results(args.results)
+    classifier = IntakeClassifier(threshold=args.threshold)
+    if not classifier.train(examples):
+        raise SystemExit("No LLM-categorized complaints to train on yet.")
+    classifier.save(args.output)
+    print(f"Trained on {len(examples)} complaints, saved to {args.output}")
+    print(f"On the training set: {evaluate(classifier, examples)}")
@@ -0,0 +1,70 @@
+"""Standalone complaint worker.
+
+Claims complaints from the shared database under a lease and runs them
+through the workflow, independently of the API processes. Start as many as
+needed, on any host that can reach the database:
+
+    python worker.py --concurrency 8
+
+Run the API with PROCESS_IN_API=0 to leave all processing to workers.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from fastapi.concurrency import run_in_threadpool
+
+import server
+from database import claim_complaints, init_db
+
+logger = logging.getLogger("worker")
+
+
+async def run_worker(concurrency: int, poll_interval: float):
+    init_db()
+    await server.init_workflow()
+    logger.info("Worker %s started (concurrency=%d)", server.WORKER_ID, concurrency)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    running: set[asyncio.Task] = set()
+    try:
+        while not stop.is_set():
+            free = concurrency - len(running)
+            claimed = []
+            if free:
+                claimed = await run_in_threadpool(
+                    claim_complaints, server.WORKER_ID, free, server.LEASE_SECONDS
+                )
+            for row in claimed:
+                task = asyncio.create_task(server.run_claimable(row))
+                running.add(task)
+                task.add_done_callback(running.discard)
+
+            # Wake up when a slot frees, the poll interval passes, or we stop.
+            full = len(running) >= concurrency
+            stopping = asyncio.create_task(stop.wait())
+            await asyncio.wait(
+                [*running, stopping],
+                timeout=None if full else poll_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            stopping.cancel()
+    finally:
+        if running:
+            logger.info("Draining %d running complaints", len(running))
+            await asyncio.gather(*running, return_exceptions=True)
+        await server.close_workflow()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--concurrency", type=int, default=server.WORKER_COUNT)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.concurrency, args.poll_interval))